@@ -4,15 +4,23 @@ Enterprise Demo - Phase 1 PoC
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from collections import Counter
 from datetime import datetime
-import json
+from typing import TYPE_CHECKING
+import hashlib
+import mmap
 import os
 
-from src.detector import GhostAIDetector
-from src.vector_db import SentinelVectorStore
+import orjson
+
+# Plotly, the detector (OpenAI/LangGraph) and the vector store (LangChain/
+# HuggingFace) are imported on first use to keep cold start fast.
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+    from src.detector import GhostAIDetector
+    from src.vector_db import SentinelVectorStore
 
 # Page configuration
 st.set_page_config(
@@ -58,16 +66,99 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Risk category lookups (built once at import)
+_RISK_COLORS = {
+    "APPROVED": "#10b981",
+    "LOW_RISK": "#3b82f6",
+    "MEDIUM_RISK": "#f59e0b",
+    "HIGH_RISK": "#ef4444",
+    "CRITICAL": "#991b1b"
+}
+_RISK_CATEGORIES = tuple(_RISK_COLORS)
+# Indexed by Categorical codes; the trailing gray covers categories outside _RISK_CATEGORIES
+_RISK_COLOR_ARR = np.array([*_RISK_COLORS.values(), "#6b7280"])
+_RISK_BADGE_CLASS = {k: k.lower().replace("_", "-") for k in _RISK_COLORS}
+_BADGE_HTML = {k: f'<span class="risk-badge {css}">{k}</span>' for k, css in _RISK_BADGE_CLASS.items()}
+_HIGH_SET = frozenset({"HIGH_RISK", "CRITICAL"})
+
 def get_risk_color(category: str) -> str:
     """Map risk category to color"""
-    colors = {
-        "APPROVED": "#10b981",
-        "LOW_RISK": "#3b82f6",
-        "MEDIUM_RISK": "#f59e0b",
-        "HIGH_RISK": "#ef4444",
-        "CRITICAL": "#991b1b"
-    }
-    return colors.get(category, "#6b7280")
+    return _RISK_COLORS.get(category, "#6b7280")
+
+def risk_categorical(values) -> pd.Categorical:
+    """Risk categories in fixed severity order, with any unknown labels appended"""
+    cats = pd.Categorical(values)
+    extra = [c for c in cats.categories if c not in _RISK_COLORS]
+    return cats.set_categories([*_RISK_CATEGORIES, *extra])
+
+def risk_colors(codes: np.ndarray) -> np.ndarray:
+    """Vectorized category -> color gather over Categorical codes"""
+    return _RISK_COLOR_ARR[np.minimum(codes, len(_RISK_CATEGORIES))]
+
+@st.cache_resource(show_spinner=False)
+def get_detector(provider: str = None, api_key: str = None) -> "GhostAIDetector":
+    """Build the detector once per (provider, api_key) and reuse it across reruns"""
+    from src.detector import GhostAIDetector
+    return GhostAIDetector(provider=provider, api_key=api_key)
+
+@st.cache_resource(show_spinner=False)
+def get_vector_store() -> "SentinelVectorStore":
+    """Load the FAISS store and embedding model once per process"""
+    from src.vector_db import SentinelVectorStore
+    return SentinelVectorStore()
+
+@st.cache_data(show_spinner=False)
+def load_sample_logs(path: str, mtime: float = None) -> list:
+    """Parse a JSON log file once per (path, mtime) straight from a memory map"""
+    if os.path.getsize(path) == 0:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return orjson.loads(memoryview(mm))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def parse_uploaded_logs(data: bytes) -> list:
+    """Parse an uploaded JSON array or JSON-lines log file once per distinct content"""
+    if data.lstrip()[:1] == b"[":
+        return orjson.loads(data)
+    return [orjson.loads(line) for line in data.splitlines() if line.strip()]
+
+def results_digest(results: list) -> str:
+    """Stable fingerprint of an analysis batch, used as a cache key"""
+    payload = orjson.dumps(results, option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(payload).hexdigest()
+
+def result_fingerprint(result: dict) -> str:
+    """Identity of a single analysed request, used to avoid re-indexing it"""
+    log = result.get('log_entry', {})
+    key = (log.get('timestamp', ''), log.get('user_id', ''), log.get('request_url', ''),
+           log.get('payload_snippet', ''), result.get('risk_category', ''))
+    return hashlib.blake2b(orjson.dumps(key, default=str), digest_size=16).hexdigest()
+
+@st.cache_data(show_spinner=False)
+def _cached_analytics(results_key: str, _results: list):
+    """Aggregate a batch once; reruns with the same batch reuse the frames"""
+    # A pure aggregation: no detector (or LLM client) is needed
+    from src.detector import GhostAIDetector
+    analytics = GhostAIDetector.get_analytics(_results)
+    dept = analytics.get('department_risk', {})
+    sens = analytics.get('sensitive_exfiltration_breakdown', {})
+    dept_df = pd.DataFrame({"Department": list(dept), "Avg Risk Score": list(dept.values())})
+    sens_df = pd.DataFrame({"Data Type": list(sens), "Occurrences": list(sens.values())})
+    return dept_df, sens_df
+
+@st.cache_data(show_spinner=False)
+def _behavioral_figures(results_key: str, _results: list):
+    """Build the department and sensitive-data charts once per batch"""
+    import plotly.express as px
+    dept_df, sens_df = _cached_analytics(results_key, _results)
+    dept_fig = sens_fig = None
+    if not dept_df.empty:
+        dept_fig = px.bar(dept_df, x='Department', y='Avg Risk Score', color='Avg Risk Score',
+                          color_continuous_scale='Reds', title="Average Risk Exposure by Dept")
+    if not sens_df.empty:
+        sens_fig = px.pie(sens_df, values='Occurrences', names='Data Type', hole=.3,
+                          title="Types of Sensitive Data Intercepted")
+    return dept_fig, sens_fig
 
 def render_header():
     """Render application header"""
@@ -80,68 +171,43 @@ def render_header():
     with col2:
         st.caption("AI Sentinel - Enterprise Edition")
 
-def render_metrics(results: list):
+@st.cache_data(show_spinner=False)
+def summarize_categories(results_key: str, _results: list) -> dict:
+    """Risk-category counts for a batch, computed once and shared by the dashboard"""
+    return pd.Series([r['risk_category'] for r in _results], dtype=object).value_counts().to_dict()
+
+def render_metrics(results: list, category_counts: dict = None):
     """Render key metrics dashboard"""
     if not results:
         return
     
+    counts = category_counts or summarize_categories(results_digest(results), results)
     total = len(results)
-    high_critical = len([r for r in results if r['risk_category'] in ['HIGH_RISK', 'CRITICAL']])
-    medium = len([r for r in results if r['risk_category'] == 'MEDIUM_RISK'])
-    approved = len([r for r in results if r['risk_category'] == 'APPROVED'])
+    high_critical = sum(counts.get(cat, 0) for cat in _HIGH_SET)
+    medium = counts.get('MEDIUM_RISK', 0)
+    approved = counts.get('APPROVED', 0)
     
-    # Calculate prevented breaches (high + critical)
-    breaches_prevented = high_critical
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            label="Total Requests",
-            value=total,
-            delta=None
-        )
-    
-    with col2:
-        st.metric(
-            label="🚨 Critical/High Risk",
-            value=high_critical,
-            delta=f"{(high_critical/total*100):.1f}%" if total > 0 else "0%",
-            delta_color="inverse"
-        )
-    
-    with col3:
-        st.metric(
-            label="⚠️ Medium Risk",
-            value=medium,
-            delta=f"{(medium/total*100):.1f}%" if total > 0 else "0%",
-            delta_color="off"
-        )
+    # total > 0 is guaranteed by the early return above
+    pct = 100.0 / total
+    specs = (
+        ("Total Requests", total, None, "normal"),
+        ("🚨 Critical/High Risk", high_critical, f"{high_critical * pct:.1f}%", "inverse"),
+        ("⚠️ Medium Risk", medium, f"{medium * pct:.1f}%", "off"),
+        ("✅ Approved", approved, f"{approved * pct:.1f}%", "normal")
+    )
     
-    with col4:
-        st.metric(
-            label="✅ Approved",
-            value=approved,
-            delta=f"{(approved/total*100):.1f}%" if total > 0 else "0%",
-            delta_color="normal"
-        )
+    for col, (label, value, delta, delta_color) in zip(st.columns(4), specs):
+        col.metric(label=label, value=value, delta=delta, delta_color=delta_color)
 
-def render_risk_distribution(results: list):
-    """Render risk distribution chart"""
-    if not results:
-        return
-    
-    # Count by category
-    categories = {}
-    for r in results:
-        cat = r['risk_category']
-        categories[cat] = categories.get(cat, 0) + 1
-    
-    # Create pie chart
+@st.cache_data(show_spinner=False)
+def _risk_distribution_figure(category_counts: tuple) -> "go.Figure":
+    """Build the risk pie once per distinct set of category counts"""
+    import plotly.graph_objects as go
+    labels = [cat for cat, _ in category_counts]
     fig = go.Figure(data=[go.Pie(
-        labels=list(categories.keys()),
-        values=list(categories.values()),
-        marker=dict(colors=[get_risk_color(cat) for cat in categories.keys()]),
+        labels=labels,
+        values=[count for _, count in category_counts],
+        marker=dict(colors=risk_colors(risk_categorical(labels).codes).tolist()),
         hole=.4
     )])
     
@@ -150,59 +216,132 @@ def render_risk_distribution(results: list):
         showlegend=True,
         height=400
     )
+    return fig
+
+def render_risk_distribution(results: list, category_counts: dict = None):
+    """Render risk distribution chart"""
+    if not results:
+        return
+    
+    # Count by category
+    categories = category_counts or summarize_categories(results_digest(results), results)
+    
+    fig = _risk_distribution_figure(tuple(categories.items()))
+    st.plotly_chart(fig, use_container_width=True, key="risk_distribution")
+
+# Result cards rendered per "Show more" page in the detailed analysis list
+DETAIL_PAGE_SIZE = 50
+
+def _show_more_details():
+    """Button callback: reveal the next page of result cards"""
+    st.session_state['detail_pages'] = st.session_state.get('detail_pages', 1) + 1
+
+# Upper bound on points sent to the browser for the timeline scatter
+TIMELINE_MAX_POINTS = int(os.getenv("TIMELINE_MAX_POINTS", "2000"))
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: pick `threshold` points that keep the visual shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
     
-    st.plotly_chart(fig)
+    bucket_size = (n - 2) / (threshold - 2)
+    selected = [0]
+    anchor = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Triangle area between the previous pick, each candidate and the next bucket's mean
+        area = np.abs((x[anchor] - avg_x) * (y[start:end] - y[anchor])
+                      - (x[anchor] - x[start:end]) * (avg_y - y[anchor]))
+        anchor = start + int(area.argmax())
+        selected.append(anchor)
+    selected.append(n - 1)
+    return np.asarray(selected)
 
-def render_timeline(results: list):
+def downsample_timeline(df: pd.DataFrame, max_points: int = TIMELINE_MAX_POINTS) -> pd.DataFrame:
+    """LTTB-downsample each category series so the payload stays bounded"""
+    if len(df) <= max_points:
+        return df
+    
+    parts = []
+    for _, group in df.groupby('category', sort=False, observed=True):
+        group = group.sort_values('timestamp')
+        budget = max(3, round(max_points * len(group) / len(df)))
+        x = group['timestamp'].to_numpy(dtype='int64').astype(float)
+        y = group['risk_score'].to_numpy(dtype=float)
+        parts.append(group.iloc[_lttb_indices(x, y, budget)])
+    return pd.concat(parts)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _timeline_figure(results_key: str, _results: list):
+    """Build the risk timeline once per batch; returns None if nothing is plottable"""
+    import plotly.graph_objects as go
+    # Skip entries that are missing required keys
+    rows = [
+        r for r in _results
+        if 'risk_score' in r and 'risk_category' in r
+        and isinstance(r.get('log_entry'), dict)
+        and 'timestamp' in r['log_entry'] and 'user_id' in r['log_entry']
+    ]
+    if not rows:
+        return None
+    
+    # Build column-wise and parse all timestamps in one call
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime([r['log_entry']['timestamp'] for r in rows],
+                                    format='ISO8601', utc=True, cache=True),
+        'user': pd.Series([r['log_entry']['user_id'] for r in rows], dtype=str).str.split('@', n=1).str[0],
+        'risk_score': [r['risk_score'] for r in rows],
+        'category': risk_categorical([r['risk_category'] for r in rows])
+    })
+    total_points = len(df)
+    df = downsample_timeline(df)
+    title = "Risk Score Timeline"
+    if len(df) < total_points:
+        title += f" (showing {len(df):,} of {total_points:,} points)"
+    
+    # One WebGL trace per category (keeps the legend); colors follow the fixed category order
+    df['category'] = df['category'].cat.remove_unused_categories()
+    categories = df['category'].cat.categories
+    colors = risk_colors(risk_categorical(categories).codes)
+    fig = go.Figure([
+        go.Scattergl(
+            x=group['timestamp'],
+            y=group['risk_score'],
+            mode='markers',
+            name=str(category),
+            marker=dict(color=color),
+            text=group['user'],
+            hovertemplate='%{text}<br>risk_score=%{y}'
+        )
+        for (category, group), color in zip(df.groupby('category', sort=True, observed=True), colors)
+    ])
+    
+    fig.update_layout(title=title, xaxis_title='timestamp', yaxis_title='risk_score',
+                      legend_title_text='category', height=400, hovermode='x')
+    return fig
+
+def render_timeline(results: list, results_key: str = None):
     """Render timeline of detections"""
     if not results:
         return
     
-    # Prepare data
-    data = []
-    for r in results:
-        try:
-            data.append({
-                'timestamp': r['log_entry']['timestamp'],
-                'user': r['log_entry']['user_id'].split('@')[0],
-                'risk_score': r['risk_score'],
-                'category': r['risk_category']
-            })
-        except (KeyError, TypeError) as e:
-            # Skip entries that are missing required keys
-            continue
-    
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Create scatter plot
-    fig = px.scatter(
-        df,
-        x='timestamp',
-        y='risk_score',
-        color='category',
-        hover_data=['user'],
-        color_discrete_map={
-            'APPROVED': '#10b981',
-            'LOW_RISK': '#3b82f6',
-            'MEDIUM_RISK': '#f59e0b',
-            'HIGH_RISK': '#ef4444',
-            'CRITICAL': '#991b1b'
-        },
-        title="Risk Score Timeline"
-    )
-    
-    fig.update_layout(height=400)
-    st.plotly_chart(fig)
+    fig = _timeline_figure(results_key or results_digest(results), results)
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, key="risk_timeline")
 
-def render_result_card(result: dict, index: int):
+def render_result_card(result: dict, index: int, expanded: bool = False):
     """Render individual result card"""
     log = result['log_entry']
     risk_cat = result['risk_category']
     
     with st.expander(
         f"#{index+1} | {log['user_id']} → {risk_cat} (Score: {result['risk_score']})",
-        expanded=False
+        expanded=expanded
     ):
         col1, col2 = st.columns([2, 1])
         
@@ -216,8 +355,7 @@ def render_result_card(result: dict, index: int):
         
         with col2:
             # Risk badge
-            st.markdown(f'<span class="risk-badge {risk_cat.lower().replace("_", "-")}">{risk_cat}</span>', 
-                       unsafe_allow_html=True)
+            st.markdown(_BADGE_HTML.get(risk_cat, risk_cat), unsafe_allow_html=True)
             st.markdown(f"**Risk Score:** {result['risk_score']}/100")
             
             if result.get('detected_sensitive_data'):
@@ -239,8 +377,99 @@ def render_result_card(result: dict, index: int):
             
         if result.get('mitigation_actions'):
             st.markdown("**⚡ SOAR Actions Taken:**")
-            for action in result['mitigation_actions']:
-                st.code(f"EXEC: {action}", language="bash")
+            st.code("\n".join(f"EXEC: {action}" for action in result['mitigation_actions']), language="bash")
+
+def results_frame(results: list) -> pd.DataFrame:
+    """Column view (risk_category, risk_score) of a batch for vectorized filtering"""
+    return pd.DataFrame({
+        "risk_category": pd.Series([r['risk_category'] for r in results], dtype=object),
+        "risk_score": pd.to_numeric(pd.Series([r.get('risk_score') for r in results]), errors="coerce").fillna(0)
+    })
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def ranked_positions(results_key: str, _frame: pd.DataFrame, risk_filter: tuple) -> np.ndarray:
+    """Row positions matching risk_filter by descending score, cached per (batch, filter)"""
+    if risk_filter:
+        positions = np.flatnonzero(_frame["risk_category"].isin(risk_filter).to_numpy())
+    else:
+        positions = np.arange(len(_frame))
+    order = np.argsort(-_frame["risk_score"].to_numpy()[positions], kind="stable")
+    return positions[order]
+
+def rank_results(results: list, frame: pd.DataFrame, risk_filter: list, results_key: str = None) -> list:
+    """Filter by category and order by descending risk score using the column view"""
+    positions = ranked_positions(results_key or results_digest(results), frame, tuple(sorted(risk_filter)))
+    return [results[i] for i in positions]
+
+def render_results_table(ranked: list):
+    """Render ranked results as one virtualized table; selecting a row opens its card"""
+    logs = [r.get('log_entry', {}) for r in ranked]
+    table = pd.DataFrame({
+        "User": [log.get('user_id') for log in logs],
+        "Department": [log.get('department') for log in logs],
+        "URL": [log.get('request_url') for log in logs],
+        "Risk": [r['risk_category'] for r in ranked],
+        "Score": [r['risk_score'] for r in ranked],
+        "Reasoning": [r.get('reasoning', '') for r in ranked]
+    })
+    
+    event = st.dataframe(
+        table,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Score": st.column_config.ProgressColumn("Score", min_value=0, max_value=100, format="%d"),
+            "Reasoning": st.column_config.TextColumn("Reasoning", width="large")
+        },
+        on_select="rerun",
+        selection_mode="single-row",
+        key="detail_table"
+    )
+    for row in event.selection.rows:
+        render_result_card(ranked[row], row, expanded=True)
+
+@st.fragment
+def render_detailed_analysis(results: list, frame: pd.DataFrame = None, results_key: str = None):
+    """Filterable result list; filter changes rerun only this fragment"""
+    if frame is None or len(frame) != len(results):
+        frame = results_frame(results)
+    
+    st.header("🔍 Detailed Analysis")
+    
+    # Filter options
+    filter_col1, filter_col2 = st.columns([1, 3])
+    with filter_col1:
+        risk_filter = st.multiselect(
+            "Filter by Risk",
+            options=['APPROVED', 'LOW_RISK', 'MEDIUM_RISK', 'HIGH_RISK', 'CRITICAL'],
+            default=['HIGH_RISK', 'CRITICAL', 'MEDIUM_RISK'],
+            key="risk_filter"
+        )
+    with filter_col2:
+        card_view = st.toggle(
+            "Expanded cards",
+            value=False,
+            key="detail_card_view",
+            help="Render each result as an expandable card instead of a table (slower for large batches)"
+        )
+    
+    # Filter & Sort
+    filtered_results = rank_results(results, frame, risk_filter, results_key)
+    
+    if card_view:
+        # Only the visible pages are rendered
+        visible = DETAIL_PAGE_SIZE * st.session_state.get('detail_pages', 1)
+        top_results = filtered_results[:visible]
+        
+        st.caption(f"Showing {len(top_results)} of {len(filtered_results)} matching requests "
+                   f"({len(results)} total)")
+        for idx, result in enumerate(top_results):
+            render_result_card(result, idx)
+        if len(top_results) < len(filtered_results):
+            st.button("Show more", key="detail_show_more", on_click=_show_more_details)
+    else:
+        st.caption(f"Showing {len(filtered_results)} of {len(results)} requests")
+        render_results_table(filtered_results)
 
 def render_soar_activity(results: list):
     """Render aggregate SOAR activity log for the session"""
@@ -261,80 +490,74 @@ def render_soar_activity(results: list):
         st.caption("Actions are only triggered for HIGH_RISK or CRITICAL threats when Agentic Logic is enabled.")
         return
 
-    for event in soar_events:
-        risk_color = "red" if event['risk'] == "CRITICAL" else "orange"
-        st.markdown(f"**:{risk_color}[{event['risk']}]** | User: `{event['user']}` | Action: `{event['action']}`")
+    lines = [
+        f"**:{'red' if event['risk'] == 'CRITICAL' else 'orange'}[{event['risk']}]** | "
+        f"User: `{event['user']}` | Action: `{event['action']}`"
+        for event in soar_events
+    ]
+    st.markdown("\n\n".join(lines))
 
-def render_behavioral_analytics(results: list):
+def render_behavioral_analytics(results: list, results_key: str = None):
     """Render Phase 3 Advanced Analytics"""
     st.header("🔬 Behavioral Analytics")
     
     if not results:
         return
         
-    detector = GhostAIDetector()
-    analytics = detector.get_analytics(results)
+    dept_fig, sens_fig = _behavioral_figures(results_key or results_digest(results), results)
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Ghost AI Exposure Heatmap
         st.subheader("🔥 Ghost AI Exposure by Department")
-        # Ensure 'department_risk' data is formatted for DataFrame
-        dept_data = [{"Department": k, "Avg Risk Score": v} for k, v in analytics.get('department_risk', {}).items()]
-        dept_df = pd.DataFrame(dept_data)
-        if not dept_df.empty:
-            fig = px.bar(dept_df, x='Department', y='Avg Risk Score', color='Avg Risk Score',
-                         color_continuous_scale='Reds', title="Average Risk Exposure by Dept")
-            st.plotly_chart(fig, use_container_width=True)
+        if dept_fig is not None:
+            st.plotly_chart(dept_fig, use_container_width=True, key="department_exposure")
         else:
             st.info("No department data available.")
         
     with col2:
         st.subheader("💸 Sensitive Data Exposure")
-        # Ensure 'sensitive_exfiltration_breakdown' data is formatted for DataFrame
-        sens_data = [{"Data Type": k, "Occurrences": v} for k, v in analytics.get('sensitive_exfiltration_breakdown', {}).items()]
-        sens_df = pd.DataFrame(sens_data)
-        if not sens_df.empty:
-            fig = px.pie(sens_df, values='Occurrences', names='Data Type', hole=.3,
-                         title="Types of Sensitive Data Intercepted")
-            st.plotly_chart(fig, use_container_width=True)
+        if sens_fig is not None:
+            st.plotly_chart(sens_fig, use_container_width=True, key="sensitive_exposure")
         else:
             st.info("No sensitive data exfiltration detected in this batch.")
 
+@st.fragment
 def render_action_center(results: list):
-    """Human-in-the-loop Action Center"""
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("🛡️ Action Center (Phase 3)")
+    """Human-in-the-loop Action Center (call inside `with st.sidebar`)"""
+    st.markdown("---")
+    st.subheader("🛡️ Action Center (Phase 3)")
     
     pending = [r for r in results if r['risk_category'] in ['HIGH_RISK', 'MEDIUM_RISK']]
     
     if not pending:
-        st.sidebar.success("✅ No pending reviews.")
+        st.success("✅ No pending reviews.")
         return
         
-    st.sidebar.warning(f"⚠️ {len(pending)} threats require manual review")
+    st.warning(f"⚠️ {len(pending)} threats require manual review")
     
     for i, p in enumerate(pending[:3]): # Show top 3
-        with st.sidebar.expander(f"Review: {p.get('log_entry', {}).get('user_id', 'User')}"):
+        with st.expander(f"Review: {p.get('log_entry', {}).get('user_id', 'User')}"):
             st.write(f"**Risk:** {p['risk_category']}")
             st.write(f"**Reason:** {p['reasoning'][:100]}...")
             col1, col2 = st.columns(2)
             if col1.button("✅ Approve", key=f"app_{i}"):
-                st.sidebar.toast("Action Approved & Logged")
+                st.toast("Action Approved & Logged")
             if col2.button("🚫 Block", key=f"blk_{i}"):
-                st.sidebar.toast("Request Blocked")
+                st.toast("Request Blocked")
 
 def export_incident_report(results: list):
     """Generate and export a security incident report"""
     st.sidebar.markdown("---")
-    if st.sidebar.button("📄 Export Incident Report"):
+    if st.sidebar.button("📄 Export Incident Report", key="export_report"):
+        counts = Counter(r['risk_category'] for r in results)
         report = {
             "report_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "summary": {
                 "total_analyzed": len(results),
-                "critical_threats": len([r for r in results if r['risk_category'] == 'CRITICAL']),
-                "high_risk_threats": len([r for r in results if r['risk_category'] == 'HIGH_RISK'])
+                "critical_threats": counts['CRITICAL'],
+                "high_risk_threats": counts['HIGH_RISK']
             },
             "detailed_incidents": [
                 {
@@ -342,17 +565,110 @@ def export_incident_report(results: list):
                     "risk": r['risk_category'],
                     "reason": r['reasoning'],
                     "actions": r.get("mitigation_actions", [])
-                } for r in results if r['risk_category'] in ['CRITICAL', 'HIGH_RISK']
+                } for r in results if r['risk_category'] in _HIGH_SET
             ]
         }
-        report_json = json.dumps(report, indent=2)
+        report_json = orjson.dumps(report, option=orjson.OPT_INDENT_2)
         st.sidebar.download_button(
             label="Download JSON Report",
             data=report_json,
             file_name=f"ai_sentinel_report_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
+            mime="application/json",
+            key="download_report"
         )
 
+# Most recent chat turns rendered as individual chat bubbles
+CHAT_VISIBLE_MESSAGES = 20
+
+@st.fragment
+def render_security_advisor(results: list, provider: str, api_key: str = None):
+    """Chat with the Security Advisor; reruns stay scoped to this fragment"""
+    # Initialize history
+    if 'chat_history' not in st.session_state:
+        st.session_state.chat_history = []
+    
+    history = st.session_state.chat_history
+    archived = max(0, len(history) - CHAT_VISIBLE_MESSAGES)
+    
+    # Older turns are pre-rendered into one markdown block; only the delta is appended
+    if archived:
+        transcript = st.session_state.setdefault('chat_transcript', {"count": 0, "markdown": ""})
+        if transcript["count"] > archived:
+            transcript.update(count=0, markdown="")
+        if transcript["count"] < archived:
+            transcript["markdown"] += "".join(
+                f"**{'You' if m.type == 'human' else 'Advisor'}:** {m.content}\n\n"
+                for m in history[transcript["count"]:archived]
+            )
+            transcript["count"] = archived
+        with st.expander(f"Earlier messages ({archived})", expanded=False):
+            st.markdown(transcript["markdown"])
+    
+    # Display recent chat messages
+    for message in history[archived:]:
+        if message.type == "human":
+            with st.chat_message("user"):
+                st.markdown(message.content)
+        else:
+            with st.chat_message("assistant"):
+                st.markdown(message.content)
+    
+    # Chat input
+    if prompt := st.chat_input("How can I help you keep our organization secure?", key="advisor_prompt"):
+        # LangChain and the advisor are only needed once the user asks something
+        from langchain_core.messages import HumanMessage, AIMessage
+        
+        if 'advisor' not in st.session_state:
+            from src.agents import SecurityAdvisor
+            
+            # Initialize Vector Store if not already done
+            if 'vector_store' not in st.session_state:
+                st.session_state['vector_store'] = get_vector_store()
+                
+            st.session_state.advisor = SecurityAdvisor(
+                provider=provider,
+                api_key=api_key,
+                vector_store=st.session_state['vector_store']
+            )
+        
+        # Add user message to history
+        st.session_state.chat_history.append(HumanMessage(content=prompt))
+        with st.chat_message("user"):
+            st.markdown(prompt)
+        
+        # Generate response
+        with st.chat_message("assistant"):
+            with st.spinner("Thinking..."):
+                response = st.session_state.advisor.ask(
+                    query=prompt,
+                    context=results,
+                    history=st.session_state.chat_history[-5:] # Last 5 for context
+                )
+                st.markdown(response)
+                st.session_state.chat_history.append(AIMessage(content=response))
+
+# Agentic SOAR workflow diagram, formatted once at import
+ARCHITECTURE_MERMAID = """```mermaid
+graph TD
+    User((Log Entry)) --> Detector[GhostAIDetector]
+    Detector --> Agent[LangGraph Security Agent]
+    
+    subgraph "Agent Orchestration"
+        Agent --> Analyzer[analyzer node]
+        Analyzer --> Mitigator[mitigator node]
+    end
+    
+    Mitigator --> |CRITICAL| Webhook[Webhook Manager]
+    Mitigator --> |HIGH/CRITICAL| Notify[Notification Manager]
+    
+    Webhook --> |Firewall Action| FW[Block IP / Firewall]
+    Webhook --> |SOC Action| Incident[Create Incident]
+    Notify --> |Alert| Slack[Slack / Teams]
+    
+    Mitigator --> Result[Final Risk Report]
+```"""
+
+@st.fragment
 def render_architecture_map():
     """Render the Phase 2 Architecture Map in a collapsible expander"""
     with st.expander("🏗️ View System Architecture Map", expanded=False):
@@ -362,26 +678,7 @@ def render_architecture_map():
         - **Security Agent** decides whether to trigger side-effects (Webhooks/Notifications).
         """)
         
-        mermaid_code = """
-        graph TD
-            User((Log Entry)) --> Detector[GhostAIDetector]
-            Detector --> Agent[LangGraph Security Agent]
-            
-            subgraph "Agent Orchestration"
-                Agent --> Analyzer[analyzer node]
-                Analyzer --> Mitigator[mitigator node]
-            end
-            
-            Mitigator --> |CRITICAL| Webhook[Webhook Manager]
-            Mitigator --> |HIGH/CRITICAL| Notify[Notification Manager]
-            
-            Webhook --> |Firewall Action| FW[Block IP / Firewall]
-            Webhook --> |SOC Action| Incident[Create Incident]
-            Notify --> |Alert| Slack[Slack / Teams]
-            
-            Mitigator --> Result[Final Risk Report]
-        """
-        st.write(f"```mermaid\n{mermaid_code}\n```")
+        st.markdown(ARCHITECTURE_MERMAID)
         st.info("💡 The 'Chain of Thought' steps seen in detailed cards represent the nodes executed in this graph.")
 
 def main():
@@ -397,14 +694,15 @@ def main():
             "Select LLM Provider",
             options=["OpenAI", "Ollama"],
             index=1 if os.getenv("LLM_PROVIDER") == "ollama" else 0,
+            key="llm_provider",
             help="Choose between cloud processing (OpenAI) or local processing (Ollama)"
         )
         
         provider_api_key = None
         if llm_provider == "OpenAI":
-            use_default_key = st.checkbox("Use backend API key", value=True)
+            use_default_key = st.checkbox("Use backend API key", value=True, key="use_default_key")
             if not use_default_key:
-                provider_api_key = st.text_input("Enter OpenAI API Key", type="password")
+                provider_api_key = st.text_input("Enter OpenAI API Key", type="password", key="provider_api_key")
             else:
                 provider_api_key = os.getenv("OPENAI_API_KEY")
                 if provider_api_key:
@@ -420,6 +718,7 @@ def main():
         use_agent = st.toggle(
             "Execute Agentic Logic (Phase 2)", 
             value=True,
+            key="use_agent",
             help="Uses LangGraph orchestration, triggers webhooks and notifications for Critical threats"
         )
         
@@ -430,12 +729,13 @@ def main():
         # File uploader
         uploaded_file = st.file_uploader(
             "Choose a JSON file",
-            type=['json'],
-            help="Upload network logs in JSON format"
+            type=['json', 'jsonl', 'ndjson'],
+            key="upload",
+            help="Upload network logs as a JSON array or JSON lines"
         )
         
         # Or use sample data
-        use_sample = st.checkbox("Use sample logs", value=True)
+        use_sample = st.checkbox("Use sample logs", value=True, key="use_sample")
         
         st.markdown("---")
         st.markdown("### 🎯 Quick Stats")
@@ -447,51 +747,74 @@ def main():
         if use_sample:
             sample_path = "data/sample_logs.json"
             if os.path.exists(sample_path):
-                with open(sample_path, 'r') as f:
-                    logs = json.load(f)
+                logs = load_sample_logs(sample_path, os.path.getmtime(sample_path))
                 st.info(f"📁 Loaded {len(logs)} sample log entries")
             else:
                 st.error(f"Sample file not found at {sample_path}")
                 return
         else:
-            logs = json.load(uploaded_file)
+            logs = parse_uploaded_logs(uploaded_file.getvalue())
             st.success(f"📁 Uploaded {len(logs)} log entries")
         
         # Analyze button
-        if st.button("🔍 Analyze Ghost AI Threats", type="primary", use_container_width=True):
-            with st.spinner("🤖 AI Sentinel is analyzing network traffic..."):
+        if st.button("🔍 Analyze Ghost AI Threats", type="primary", use_container_width=True, key="analyze_btn"):
+            with st.status("🤖 AI Sentinel is analyzing network traffic...", expanded=True) as status:
                 try:
                     # Initialize detector with user settings
-                    detector = GhostAIDetector(
+                    detector = get_detector(
                         provider=llm_provider.lower(),
                         api_key=provider_api_key
                     )
                     
-                    # Analyze logs
-                    results = detector.batch_analyze(logs, use_agent=use_agent)
+                    # Analyze logs, updating progress as results arrive
+                    results = [None] * len(logs)
+                    threats = 0
+                    progress = st.empty()
+                    step = max(1, len(logs) // 50)
+                    for done, (i, result) in enumerate(detector.stream_analyze(logs, use_agent=use_agent), 1):
+                        results[i] = result
+                        threats += result['risk_category'] in _HIGH_SET
+                        if done % step == 0 or done == len(logs):
+                            status.update(label=f"🤖 Analyzed {done}/{len(logs)} requests")
+                            progress.metric("🚨 Critical/High Risk so far", threats)
                     
                     # Store in session state
                     st.session_state['results'] = results
+                    st.session_state['results_key'] = results_digest(results)
+                    st.session_state['results_df'] = results_frame(results)
+                    st.session_state['detail_pages'] = 1
                     
                     # Phase 5: Index into Vector DB
                     if 'vector_store' not in st.session_state:
-                        st.session_state['vector_store'] = SentinelVectorStore()
+                        st.session_state['vector_store'] = get_vector_store()
                     
-                    with st.spinner("🧠 Indexing results into Vector Memory..."):
-                        st.session_state['vector_store'].add_log_entries(results)
+                    # Only embed results that have not been indexed in this session yet
+                    indexed = st.session_state.setdefault('_indexed_digests', set())
+                    fresh = {}
+                    for r in results:
+                        fresh.setdefault(result_fingerprint(r), r)
+                    new_results = [r for digest, r in fresh.items() if digest not in indexed]
+                    if new_results:
+                        with st.spinner("🧠 Indexing results into Vector Memory..."):
+                            st.session_state['vector_store'].add_log_entries(new_results)
+                        indexed.update(fresh)
                     
-                    st.success("✅ Analysis and Indexing complete!")
+                    status.update(label="✅ Analysis and Indexing complete!", state="complete", expanded=False)
                     
                 except Exception as e:
+                    status.update(label="❌ Analysis failed", state="error")
                     st.error(f"❌ Analysis failed: {str(e)}")
                     st.info("💡 Make sure you've created a .env file with your OPENAI_API_KEY")
                     return
         
         if 'results' in st.session_state:
             results = st.session_state['results']
+            results_key = st.session_state.get('results_key') or results_digest(results)
+            category_counts = summarize_categories(results_key, results)
             
             # Phase 3: Action Center & Export
-            render_action_center(results)
+            with st.sidebar:
+                render_action_center(results)
             export_incident_report(results)
             
             st.markdown("---")
@@ -502,42 +825,22 @@ def main():
             with tab1:
                 st.header("🏢 Departmental Ghost AI Trends")
                 # Metrics
-                render_metrics(results)
+                render_metrics(results, category_counts)
                 
                 st.markdown("---")
                 
                 # Charts
                 col1, col2 = st.columns(2)
                 with col1:
-                    render_risk_distribution(results)
+                    render_risk_distribution(results, category_counts)
                 with col2:
-                    render_timeline(results)
+                    render_timeline(results, results_key)
                 
                 st.markdown("---")
-                render_behavioral_analytics(results)
+                render_behavioral_analytics(results, results_key)
                 
                 st.markdown("---")
-                st.header("🔍 Detailed Analysis")
-                
-                # Filter options
-                filter_col1, filter_col2 = st.columns([1, 3])
-                with filter_col1:
-                    risk_filter = st.multiselect(
-                        "Filter by Risk",
-                        options=['APPROVED', 'LOW_RISK', 'MEDIUM_RISK', 'HIGH_RISK', 'CRITICAL'],
-                        default=['HIGH_RISK', 'CRITICAL', 'MEDIUM_RISK']
-                    )
-                
-                # Filter & Sort
-                if risk_filter:
-                    filtered_results = [r for r in results if r['risk_category'] in risk_filter]
-                else:
-                    filtered_results = results
-                filtered_results = sorted(filtered_results, key=lambda x: x['risk_score'], reverse=True)
-                
-                st.caption(f"Showing {len(filtered_results)} of {len(results)} requests")
-                for idx, result in enumerate(filtered_results):
-                    render_result_card(result, idx)
+                render_detailed_analysis(results, st.session_state.get('results_df'), results_key)
             
             with tab2:
                 render_soar_activity(results)
@@ -548,49 +851,7 @@ def main():
                 Ask our Virtual Security Assistant anything about the current analysis, organizational policies, or general security best practices.
                 """)
                 
-                from src.agents import SecurityAdvisor
-                from langchain_core.messages import HumanMessage, AIMessage
-                
-                # Initialize advisor and history
-                if 'advisor' not in st.session_state:
-                    # Initialize Vector Store if not already done
-                    if 'vector_store' not in st.session_state:
-                        st.session_state['vector_store'] = SentinelVectorStore()
-                        
-                    st.session_state.advisor = SecurityAdvisor(
-                        provider=llm_provider.lower(),
-                        api_key=provider_api_key,
-                        vector_store=st.session_state['vector_store']
-                    )
-                if 'chat_history' not in st.session_state:
-                    st.session_state.chat_history = []
-                
-                # Display chat messages
-                for message in st.session_state.chat_history:
-                    if isinstance(message, HumanMessage):
-                        with st.chat_message("user"):
-                            st.markdown(message.content)
-                    else:
-                        with st.chat_message("assistant"):
-                            st.markdown(message.content)
-                
-                # Chat input
-                if prompt := st.chat_input("How can I help you keep our organization secure?"):
-                    # Add user message to history
-                    st.session_state.chat_history.append(HumanMessage(content=prompt))
-                    with st.chat_message("user"):
-                        st.markdown(prompt)
-                    
-                    # Generate response
-                    with st.chat_message("assistant"):
-                        with st.spinner("Thinking..."):
-                            response = st.session_state.advisor.ask(
-                                query=prompt,
-                                context=results,
-                                history=st.session_state.chat_history[-5:] # Last 5 for context
-                            )
-                            st.markdown(response)
-                            st.session_state.chat_history.append(AIMessage(content=response))
+                render_security_advisor(results, llm_provider.lower(), provider_api_key)
     
     else:
         # Welcome screen
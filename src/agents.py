@@ -4,14 +4,17 @@ Uses LangGraph to coordinate security analysis tools.
 """
 
 import os
-import json
+import re
+import asyncio
 import operator
-from typing import Dict, List, Any, TypedDict, Annotated
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, TypedDict, Annotated
+
+import orjson
 
 # Simplified imports for CI compatibility
 try:
     from langchain_openai import ChatOpenAI
-    from langchain_community.chat_models import ChatOllama
     from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
     from langgraph.graph import StateGraph, END
     LANGCHAIN_AVAILABLE = True
@@ -19,9 +22,39 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
     BaseMessage = Any
 
-from src.policies import APPROVED_DOMAINS, EXTERNAL_AI_SERVICES, get_detection_prompt
+from src.policies import APPROVED_DOMAINS, EXTERNAL_AI_SERVICES, DEFAULT_DETECTION_PROMPT
 from src.webhooks import WebhookManager, simulate_create_incident
 from src.notifications import broadcast_alert
+from src.response_cache import ResponseCache, get_response_cache
+
+# Detection prompt built once from the (import-time) policy lists
+SYSTEM_PROMPT = DEFAULT_DETECTION_PROMPT
+
+# LLM reply parsing: prefer a ```json fenced block, else first "{" to last "}"
+_FENCED_JSON_RE = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL)
+_BARE_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+def _json_default(value: Any) -> str:
+    """orjson fallback: decode UTF-8 byte payloads, stringify anything else"""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+@lru_cache(maxsize=1)
+def _shared_http_client():
+    """Pooled keep-alive HTTP client reused by every ChatOpenAI instance (HTTP/2 if h2 is installed)"""
+    import httpx
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.Client(http2=http2, limits=httpx.Limits(max_connections=64, max_keepalive_connections=64))
+
+def _async_http_client():
+    """Async HTTP client for one batch; its pool is bound to the batch's event loop"""
+    import httpx
+    return httpx.AsyncClient(limits=httpx.Limits(max_connections=64, max_keepalive_connections=64))
 
 # Define the state for our security agent
 class AgentState(TypedDict):
@@ -39,24 +72,39 @@ class SecurityAgent:
     def __init__(self, provider: str = "openai", api_key: str = None):
         self.provider = provider
         self.api_key = api_key
+        if provider == "ollama":
+            self.model = os.getenv("OLLAMA_MODEL", "llama3.2:1b")
+        else:
+            self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.llm = None
+        self.workflow = None
+        self.app = None
         
-        # Initialize LLM only if LangChain is available
+        # Initialize LLM only if LangChain is available (and OpenAI has a key)
         if LANGCHAIN_AVAILABLE:
             if provider == "ollama":
-                self.llm = ChatOllama(model=os.getenv("OLLAMA_MODEL", "llama3.2:1b"), temperature=0.1)
-            else:
-                self.llm = ChatOpenAI(
-                    model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                    api_key=api_key or os.getenv("OPENAI_API_KEY"),
-                    temperature=0.1
-                )
+                # Only pulled in when the local provider is actually selected
+                from langchain_community.chat_models import ChatOllama
+                self.llm = ChatOllama(model=self.model, temperature=0.1)
+            elif api_key or os.getenv("OPENAI_API_KEY"):
+                self.llm = self._openai_llm()
             
-            self.workflow = self._create_workflow()
-            self.app = self.workflow.compile()
-        else:
-            self.llm = None
-            self.workflow = None
-            self.app = None
+            if self.llm is not None:
+                self.workflow = self._create_workflow()
+                self.app = self.workflow.compile()
+        
+        # Verdicts for identical prompts are reused across runs
+        self.cache = get_response_cache() if self.llm is not None else None
+
+    def _openai_llm(self, http_async_client=None):
+        """ChatOpenAI over the shared sync pool (and the given async client, if any)"""
+        return ChatOpenAI(
+            model=self.model,
+            api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+            temperature=0.1,
+            http_client=_shared_http_client(),
+            http_async_client=http_async_client
+        )
 
     def _create_workflow(self):
         """Build the LangGraph state machine"""
@@ -73,10 +121,8 @@ class SecurityAgent:
         
         return graph
 
-    def _analyze_node(self, state: AgentState):
-        """Perform deep analysis using the LLM"""
-        log = state["log_entry"]
-        system_prompt = get_detection_prompt(APPROVED_DOMAINS, EXTERNAL_AI_SERVICES)
+    def _build_messages(self, log: Dict[str, Any]) -> List[BaseMessage]:
+        """Build the system + user messages for a single log entry"""
         pre = log.get("pre_analysis", {})
         pre_text = ""
         if pre:
@@ -85,41 +131,87 @@ class SecurityAgent:
             if pre.get("vt_malicious"): pre_text += f"- VIRUSTOTAL: Flagged as malicious ({pre.get('vt_details')})\n"
             if pre.get("detected_sensitive"): pre_text += f"- SENSITIVE DATA: Identified {', '.join(pre['detected_sensitive'])}\n"
 
-        user_content = f"Analyze this request: {json.dumps(log, indent=2)}\n{pre_text}"
+        # Compact JSON: pretty-printing only adds prompt tokens
+        user_content = f"Analyze this request: {orjson.dumps(log, default=_json_default).decode()}\n{pre_text}"
         
-        messages = [
-            SystemMessage(content=system_prompt),
+        return [
+            SystemMessage(content=SYSTEM_PROMPT),
             HumanMessage(content=user_content)
         ]
+
+    def _deterministic_analysis(self, log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        DETERMINISTIC OVERRIDE:
+        If pre-screening found a confirmed threat the verdict is always CRITICAL
+        (so mitigation tools ALWAYS trigger in Phase 2); no LLM call is needed.
+        """
+        pre = log.get("pre_analysis", {})
+        if pre.get("vt_malicious"):
+            reason = f"VirusTotal flagged the domain as malicious ({pre.get('vt_details')})."
+            user_message = "CRITICAL ALERT: Malicious activity detected."
+        elif pre.get("is_known_malicious"):
+            reason = "Domain is on the known malicious list."
+            user_message = "ACCESS BLOCKED: Known malicious site."
+        else:
+            return None
         
-        response = self.llm.invoke(messages)
-        
+        return {
+            "risk_category": "CRITICAL",
+            "risk_score": 95,
+            "reasoning": f"[DETERMINISTIC] Confirmed Threat detected: {reason}",
+            "detected_sensitive_data": pre.get("detected_sensitive", []),
+            "recommended_action": "Block and escalate",
+            "user_message": user_message
+        }
+
+    def _parse_analysis(self, content: str, log: Dict[str, Any], cache_key: str = None) -> Dict[str, Any]:
+        """Extract the JSON verdict from an LLM reply (and cache it when it parses)"""
         # Parse JSON from response
         try:
-            content = response.content
             # Handle potential markdown fencing
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "{" in content:
-                content = content[content.find("{"):content.rfind("}")+1]
+            match = _FENCED_JSON_RE.search(content) or _BARE_JSON_RE.search(content)
+            if match:
+                content = match.group(match.lastindex or 0)
                 
-            analysis = json.loads(content)
+            analysis = orjson.loads(content)
+            if not isinstance(analysis, dict):
+                raise ValueError("LLM reply is not a JSON object")
         except Exception:
-            analysis = {
+            return {
                 "risk_category": "MEDIUM_RISK",
                 "risk_score": 50,
                 "reasoning": "Agent failed to parse LLM response. Defaulting to safe fallback.",
                 "recommended_action": "Manual review required"
             }
-            
-        # DETERMINISTIC OVERRIDE: 
-        # If pre-screening found a confirmed threat, force CRITICAL status
-        # to ensure mitigation tools ALWAYS trigger in Phase 2.
-        pre = log.get("pre_analysis", {})
-        if pre.get("is_known_malicious") or pre.get("vt_malicious"):
-            analysis["risk_category"] = "CRITICAL"
-            analysis["risk_score"] = max(analysis.get("risk_score", 0), 95)
-            analysis["reasoning"] = f"[DETERMINISTIC] Confirmed Threat detected: {analysis.get('reasoning')}"
+        
+        if cache_key and self.cache is not None:
+            self.cache.set(cache_key, orjson.dumps(analysis).decode())
+        return analysis
+
+    def _cache_key(self, messages: List[BaseMessage]) -> str:
+        """Cache key for a prompt: provider, model and every message body"""
+        return ResponseCache.make_key(self.provider, self.model, *(m.content for m in messages))
+
+    def _cached_analysis(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Previously parsed verdict for an identical prompt, if any"""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(cache_key)
+        return orjson.loads(cached) if cached is not None else None
+
+    def _analyze_node(self, state: AgentState):
+        """Perform deep analysis using the LLM"""
+        log = state["log_entry"]
+        analysis = self._deterministic_analysis(log)
+        if analysis is not None:
+            return {"analysis": analysis, "tools_used": ["deterministic_override"], "mitigation_actions": []}
+        
+        messages = self._build_messages(log)
+        cache_key = self._cache_key(messages)
+        analysis = self._cached_analysis(cache_key)
+        if analysis is None:
+            response = self.llm.invoke(messages)
+            analysis = self._parse_analysis(response.content, log, cache_key)
         
         return {"analysis": analysis, "tools_used": ["llm_analyzer"], "mitigation_actions": []}
 
@@ -152,6 +244,117 @@ class SecurityAgent:
             
         return {"tools_used": ["mitigation_engine"], "mitigation_actions": actions}
 
+    def _error_result(self, log_entry: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """Conservative result used when the workflow fails for an entry"""
+        return {
+            "log_entry": log_entry,
+            "risk_category": "MEDIUM_RISK",
+            "risk_score": 50,
+            "reasoning": f"Agent workflow error: {str(error)}",
+            "recommended_action": "Manual review required",
+            "detected_sensitive_data": [],
+            "user_message": None,
+            "mitigation_actions": [],
+            "agent_steps": ["error"]
+        }
+
+    async def arun_batch(self, log_entries: List[Dict[str, Any]], max_concurrency: int = 32) -> List[Dict[str, Any]]:
+        """
+        Analyze many entries with one concurrent LLM batch, then mitigate.
+        
+        Equivalent to calling run() per entry, but the LLM requests are issued
+        together via abatch instead of one graph invocation per log.
+        """
+        if not log_entries:
+            return []
+        if self.llm is None:
+            return [self.run_fast(entry) for entry in log_entries]
+        
+        # Confirmed threats are resolved without the LLM, cached prompts are
+        # answered from the response cache; only the rest are batched
+        verdicts = []
+        to_ask = []
+        for entry in log_entries:
+            analysis = self._deterministic_analysis(entry)
+            step = "deterministic_override"
+            if analysis is None:
+                messages = self._build_messages(entry)
+                cache_key = self._cache_key(messages)
+                analysis = self._cached_analysis(cache_key)
+                step = "llm_analyzer"
+                if analysis is None:
+                    to_ask.append((entry, messages, cache_key))
+            verdicts.append((analysis, step))
+        
+        responses = iter(await self._abatch([messages for _, messages, _ in to_ask], max_concurrency)
+                         if to_ask else [])
+        asked = iter(to_ask)
+        
+        results = []
+        for entry, (analysis, step) in zip(log_entries, verdicts):
+            response = None
+            if analysis is None:
+                _, _, cache_key = next(asked)
+                response = next(responses)
+            # One bad reply or failing side effect must not lose the rest of the batch
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                if analysis is None:
+                    analysis = self._parse_analysis(response.content, entry, cache_key)
+                
+                # Mitigation only fires side effects for HIGH/CRITICAL, which are rare
+                mitigation = self._mitigation_node({"analysis": analysis, "log_entry": entry})
+            except Exception as e:
+                results.append(self._error_result(entry, e))
+                continue
+            
+            analysis["log_entry"] = entry
+            analysis["analysis_method"] = f"agentic_{self.provider}"
+            analysis["agent_steps"] = [step] + mitigation["tools_used"]
+            analysis["mitigation_actions"] = mitigation["mitigation_actions"]
+            results.append(analysis)
+        
+        return results
+
+    async def _abatch(self, prompts: List[List[BaseMessage]], max_concurrency: int) -> List[Any]:
+        """LLM replies (or exceptions) for prompts, over connections that close with this event loop"""
+        if self.provider == "ollama":
+            return await self.llm.abatch(prompts, config={"max_concurrency": max_concurrency},
+                                         return_exceptions=True)
+        # The cached agent outlives each asyncio.run, so its async pool must not be reused
+        http_client = _async_http_client()
+        try:
+            return await self._openai_llm(http_client).abatch(
+                prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True
+            )
+        finally:
+            await http_client.aclose()
+
+    def run_batch(self, log_entries: List[Dict[str, Any]], max_concurrency: int = 32) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around arun_batch (must not be called from a running event loop)"""
+        return asyncio.run(self.arun_batch(log_entries, max_concurrency=max_concurrency))
+
+    def run_fast(self, log_entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Same analyzer -> mitigator sequence as run(), called directly.
+        The graph is strictly linear, so this skips LangGraph's per-invoke
+        state copying and reducer merges.
+        """
+        try:
+            analyzed = self._analyze_node({"log_entry": log_entry})
+            mitigated = self._mitigation_node({"log_entry": log_entry, "analysis": analyzed["analysis"]})
+        except Exception as e:
+            return self._error_result(log_entry, e)
+        
+        result = analyzed["analysis"]
+        result["log_entry"] = log_entry
+        result["analysis_method"] = f"agentic_{self.provider}"
+        result["agent_steps"] = analyzed["tools_used"] + mitigated["tools_used"]
+        result["mitigation_actions"] = analyzed["mitigation_actions"] + mitigated["mitigation_actions"]
+        
+        return result
+
     def run(self, log_entry: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the agentic workflow"""
         initial_state = {
@@ -168,17 +371,7 @@ class SecurityAgent:
             final_state = self.app.invoke(initial_state)
         except Exception as e:
             # Return partial state or fallback
-            return {
-                "log_entry": log_entry,
-                "risk_category": "MEDIUM_RISK",
-                "risk_score": 50,
-                "reasoning": f"Agent workflow error: {str(e)}",
-                "recommended_action": "Manual review required",
-                "detected_sensitive_data": [],
-                "user_message": None,
-                "mitigation_actions": [],
-                "agent_steps": ["error"]
-            }
+            return self._error_result(log_entry, e)
         
         # Ensure metadata is present
         result = final_state["analysis"]
@@ -189,18 +382,25 @@ class SecurityAgent:
         
         return result
 
+@lru_cache(maxsize=8)
+def get_security_agent(provider: str = "openai", api_key: str = None) -> SecurityAgent:
+    """Process-wide SecurityAgent per (provider, api_key), so the graph is compiled once"""
+    return SecurityAgent(provider=provider, api_key=api_key)
+
 class SecurityAdvisor:
     """Conversational security assistant for interpreting risk data"""
     
     def __init__(self, provider: str = "openai", api_key: str = None, vector_store = None):
         self.vector_store = vector_store
         if provider == "ollama":
+            from langchain_community.chat_models import ChatOllama
             self.llm = ChatOllama(model=os.getenv("OLLAMA_MODEL", "llama3.2:1b"), temperature=0.7)
         else:
             self.llm = ChatOpenAI(
                 model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
                 api_key=api_key or os.getenv("OPENAI_API_KEY"),
-                temperature=0.7
+                temperature=0.7,
+                http_client=_shared_http_client()
             )
             
     def ask(self, query: str, context: List[Dict[str, Any]] = None, history: List[BaseMessage] = None) -> str:
@@ -4,27 +4,163 @@ Core logic for analyzing network requests and identifying Ghost AI usage.
 Supports multiple LLM providers: OpenAI, Ollama (free & local)
 """
 
-import json
+import asyncio
+import hashlib
+import math
 import re
 import os
-from typing import Dict, List, Any
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, List, Any, Iterable, Iterator, NamedTuple, Optional, Sized, Tuple, Union
 from urllib.parse import urlparse
 from dotenv import load_dotenv
-import pandas as pd
+import numpy as np
+import orjson
+
+# Optional: incremental parsing of large JSON-array log files
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 from src.policies import (
     APPROVED_DOMAINS,
     EXTERNAL_AI_SERVICES,
     MALICIOUS_DOMAINS,
     SENSITIVE_PATTERNS,
+    SENSITIVE_PATTERNS_BYTES,
+    category_for_score,
+    maybe_sensitive,
+    scan_sensitive,
     DEPARTMENT_RISK_LEVELS,
-    get_detection_prompt
+    domain_suffixes,
+    matches_domain,
+    ALL_DOMAINS_BY_CATEGORY,
+    build_domain_categories,
+    domain_categories,
+    primary_category,
+    DEFAULT_DETECTION_PROMPT
 )
-from src.agents import SecurityAgent
+from src.agents import get_security_agent
+from src.validators import CHECKSUM_VALIDATORS
 
 # Load environment variables
 load_dotenv()
 
+# Detection prompt built once from the (import-time) policy lists
+SYSTEM_PROMPT = DEFAULT_DETECTION_PROMPT
+# Static prompt parts frozen at import so each request only adds its own context
+_OPENAI_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+_OLLAMA_PROMPT_PREFIX = f"{SYSTEM_PROMPT}\n\n"
+_OLLAMA_PROMPT_SUFFIX = """
+
+Respond with ONLY valid JSON in this exact format:
+{
+  "risk_category": "APPROVED or LOW_RISK or MEDIUM_RISK or HIGH_RISK or CRITICAL",
+  "risk_score": 0-100,
+  "reasoning": "Brief explanation",
+  "detected_sensitive_data": ["list of data types"],
+  "recommended_action": "Action to take",
+  "user_message": "Message for user or null"
+}"""
+
+# JSON extraction for free-form (Ollama) replies
+_FENCED_JSON_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_BARE_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# Maximum number of log entries analyzed in parallel (LLM/VT calls are network-bound)
+DEFAULT_CONCURRENCY = int(os.getenv("SENTINEL_CONCURRENCY", "16"))
+# Batches at least this large aggregate analytics with NumPy; smaller ones use plain Python
+ANALYTICS_VECTORIZE_MIN = 2000
+# Payloads to approved platforms smaller than this (KB) skip the sensitive-data scan; 0 scans everything
+APPROVED_SCAN_MIN_KB = float(os.getenv("APPROVED_SCAN_MIN_KB", "0"))
+# Non-agentic LLM verdicts kept in memory, keyed on the request content
+LLM_ANALYSIS_CACHE_SIZE = 2048
+VT_DOMAIN_URL = "https://www.virustotal.com/api/v3/domains"
+# Seconds a VirusTotal verdict is reused before the domain is looked up again
+VT_CACHE_TTL = int(os.getenv("VT_CACHE_TTL", "3600"))
+# Only count account numbers / IBANs whose checksum is valid (Luhn / mod-97)
+VALIDATE_CHECKSUMS = os.getenv("SENTINEL_VALIDATE_CHECKSUMS", "0") == "1"
+
+_NETLOC_END_RE = re.compile(r"[/?#]")
+# Characters urlparse strips or treats specially; such URLs take the full parser
+_URL_SLOW_CHARS = (" ", "\t", "\r", "\n", "\\", "[", "]", "%")
+
+@lru_cache(maxsize=4096)
+def _split_url(url: str) -> Tuple[str, str]:
+    """(netloc, normalized hostname) for a request URL; logs repeat URLs heavily"""
+    # Fast path for plain ASCII "scheme://host[:port]/..." URLs: two scans, no ParseResult
+    scheme_end = url.find("://")
+    if (scheme_end > 0 and url.isascii() and url[0].isalpha()
+            and url[:scheme_end].replace("+", "").replace("-", "").replace(".", "").isalnum()
+            and not any(c in url for c in _URL_SLOW_CHARS)):
+        start = scheme_end + 3
+        end = _NETLOC_END_RE.search(url, start)
+        netloc = url[start:end.start()] if end else url[start:]
+        host = netloc.rpartition("@")[2].partition(":")[0]
+        return netloc, host.lower().rstrip(".")
+    
+    parsed = urlparse(url)
+    return parsed.netloc, (parsed.hostname or "").rstrip(".")
+
+def categorize_urls(urls: List[str], categories: dict = None) -> np.ndarray:
+    """
+    Domain category label per URL by CATEGORY_PRIORITY ("" if unlisted), as classify_url
+    
+    Each distinct host is classified once, and the labels are broadcast back
+    to the batch through np.unique's inverse index.
+    """
+    categories = ALL_DOMAINS_BY_CATEGORY if categories is None else categories
+    hosts = np.array([_split_url(url)[1] for url in urls], dtype=object)
+    if hosts.size == 0:
+        return np.array([], dtype=object)
+    unique_hosts, inverse = np.unique(hosts, return_inverse=True)
+    labels = np.empty(len(unique_hosts), dtype=object)
+    for i, host in enumerate(unique_hosts):
+        labels[i] = primary_category(domain_categories(host, categories)) or ""
+    return labels[inverse]
+
+@lru_cache(maxsize=4096)
+def _sensitive_types(text: Union[str, bytes]) -> Tuple[str, ...]:
+    """Sensitive data types found in text (str or UTF-8 bytes), memoized for repeated payloads"""
+    found = scan_sensitive(text)
+    if not VALIDATE_CHECKSUMS:
+        return found
+    patterns = SENSITIVE_PATTERNS_BYTES if isinstance(text, bytes) else SENSITIVE_PATTERNS
+    return tuple(
+        data_type for data_type in found
+        if data_type not in CHECKSUM_VALIDATORS
+        or any(CHECKSUM_VALIDATORS[data_type](_as_text(m.group())) for m in patterns[data_type].finditer(text))
+    )
+
+def _as_text(value: Union[str, bytes]) -> str:
+    """Payloads may arrive as UTF-8 bytes; prompts and validators need text"""
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+
+# Verdict shared by approved requests with no sensitive data (copied per result)
+_APPROVED_RESULT = {
+    "risk_category": "APPROVED",
+    "risk_score": 5,
+    "reasoning": "Request to approved internal AI platform with no sensitive data detected",
+    "detected_sensitive_data": [],
+    "recommended_action": "Allow",
+    "user_message": None,
+    "analysis_method": "rule_based"
+}
+
+class _PendingLLM(NamedTuple):
+    """Screening outcome that still needs the non-agentic LLM analysis"""
+    log_entry: Dict[str, Any]
+    detected_sensitive: List[str]
+    dept_risk: str
+
 class GhostAIDetector:
     """
     Ghost AI: The primary detection engine for unsanctioned AI usage.
@@ -35,13 +171,34 @@ class GhostAIDetector:
         self.provider = (provider or os.getenv("LLM_PROVIDER", "openai")).lower()
         self.vt_api_key = os.getenv("VIRUSTOTAL_API_KEY")
         
+        # Domain lists as suffix sets: classification is one lookup per hostname label
+        self._approved_domains = domain_suffixes(APPROVED_DOMAINS)
+        self._external_ai_services = domain_suffixes(EXTERNAL_AI_SERVICES)
+        self._malicious_domains = domain_suffixes(MALICIOUS_DOMAINS)
+        self._domain_categories = build_domain_categories(
+            approved=APPROVED_DOMAINS, external_ai=EXTERNAL_AI_SERVICES, malicious=MALICIOUS_DOMAINS
+        )
+        # Exact approved hosts for the empty-payload fast path (excluding any also listed as malicious)
+        self._approved_exact = frozenset(
+            d for d in self._approved_domains if not matches_domain(d, self._malicious_domains)
+        )
+        
+        # VirusTotal: one pooled session, verdicts cached per domain for VT_CACHE_TTL
+        self._vt_session = None
+        self._vt_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._vt_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._llm_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._llm_cache_lock = threading.Lock()
+        
         if self.provider == "ollama":
             self._init_ollama()
         else:
             self._init_openai(api_key)
             
-        # Initialize Phase 2 Agent
-        self.agent = SecurityAgent(provider=self.provider, api_key=api_key)
+        # Phase 2 Agent (shared per process; its LangGraph workflow is compiled once)
+        self.agent = get_security_agent(self.provider, api_key)
     
     def _init_ollama(self):
         """Initialize Ollama (local LLM)"""
@@ -74,11 +231,35 @@ class GhostAIDetector:
         """
         Analyze a single network request for Ghost AI and malicious activity
         """
+        result = self._screen_request(log_entry, use_agent=use_agent)
+        if result is None:
+            return self.agent.run_fast(log_entry)
+        return result
+
+    def _screen_request(self, log_entry: Dict[str, Any], use_agent: bool = False,
+                        defer_llm: bool = False) -> Union[Dict[str, Any], _PendingLLM, None]:
+        """
+        Pre-screen and resolve a request without the agent.
+        Returns None when the request should be handed to the agentic workflow,
+        and a _PendingLLM instead of calling the LLM when defer_llm is set.
+        """
         url = log_entry.get("request_url", "")
         payload = log_entry.get("payload_snippet", "")
         department = log_entry.get("department", "Unknown")
+        # Only a department the caller supplied is replaced (by its interned, equal copy)
+        if "department" in log_entry and type(department) is str:
+            department = log_entry["department"] = sys.intern(department)
         payload_size = log_entry.get("payload_size_kb", 0)
         
+        # Fast path: the common "approved platform, nothing to scan" request
+        if not payload and _split_url(url)[1] in self._approved_exact:
+            log_entry["pre_analysis"] = {
+                "is_known_malicious": False, "vt_malicious": False, "vt_details": "",
+                "detected_sensitive": [], "policy_violation": False
+            }
+            log_entry["is_approved"] = True
+            return {"log_entry": log_entry, **_APPROVED_RESULT}
+        
         # Enriched metadata for the agent
         pre_analysis = {
             "is_known_malicious": False,
@@ -89,10 +270,11 @@ class GhostAIDetector:
         }
         
         # 1. Quick pre-screening
-        domain = urlparse(url).netloc
-        is_approved = any(approved in domain for approved in APPROVED_DOMAINS)
-        is_external_ai = any(service in domain for service in EXTERNAL_AI_SERVICES)
-        pre_analysis["is_known_malicious"] = any(malicious in domain for malicious in MALICIOUS_DOMAINS)
+        domain, host = _split_url(url)
+        categories = domain_categories(host, self._domain_categories)
+        is_approved = "approved" in categories
+        is_external_ai = "external_ai" in categories
+        pre_analysis["is_known_malicious"] = "malicious" in categories
         
         # 2. VirusTotal Integration
         if not is_approved and not is_external_ai and self.vt_api_key:
@@ -101,8 +283,9 @@ class GhostAIDetector:
                 pre_analysis["vt_malicious"] = True
                 pre_analysis["vt_details"] = vt_result["details"]
 
-        # 3. Detect sensitive data patterns
-        pre_analysis["detected_sensitive"] = self._detect_sensitive_data(payload)
+        # 3. Detect sensitive data patterns (optionally trusting small payloads to approved platforms)
+        if payload and not (is_approved and payload_size < APPROVED_SCAN_MIN_KB):
+            pre_analysis["detected_sensitive"] = self._detect_sensitive_data(payload)
         
         # Get department risk level
         dept_risk = DEPARTMENT_RISK_LEVELS.get(department, "medium_sensitivity")
@@ -117,20 +300,11 @@ class GhostAIDetector:
         
         # 🛡️ IF APPROVED and no sensitive data, fast-track as safe
         if is_approved and not pre_analysis["detected_sensitive"]:
-            return {
-                "log_entry": log_entry,
-                "risk_category": "APPROVED",
-                "risk_score": 5,
-                "reasoning": "Request to approved internal AI platform with no sensitive data detected",
-                "detected_sensitive_data": [],
-                "recommended_action": "Allow",
-                "user_message": None,
-                "analysis_method": "rule_based"
-            }
+            return {"log_entry": log_entry, **_APPROVED_RESULT}
         
         # 🤖 Phase 2: Agentic Analysis (Handles SOAR Actions)
         if use_agent and (is_threat or is_suspicious):
-            return self.agent.run(log_entry)
+            return None
             
         # 🛡️ Fallback: Policy Violation (No Agent)
         if pre_analysis["is_known_malicious"]:
@@ -160,6 +334,8 @@ class GhostAIDetector:
 
         # For complex cases (non-agentic), use standard LLM analysis
         if is_suspicious:
+            if defer_llm:
+                return _PendingLLM(log_entry, pre_analysis["detected_sensitive"], dept_risk)
             return self._llm_analysis(log_entry, pre_analysis["detected_sensitive"], dept_risk)
         
         # Default low risk for other cases
@@ -174,219 +350,542 @@ class GhostAIDetector:
             "analysis_method": "rule_based"
         }
     
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Screening pool reused across batches (threads are started on demand)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=DEFAULT_CONCURRENCY,
+                                                    thread_name_prefix="sentinel-screen")
+            return self._executor
+
+    def _get_vt_session(self):
+        """Shared requests session with a connection pool sized for the batch workers"""
+        with self._vt_lock:
+            if self._vt_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=max(64, DEFAULT_CONCURRENCY)))
+                session.headers.update({"accept": "application/json", "x-apikey": self.vt_api_key})
+                self._vt_session = session
+            return self._vt_session
+
+    def _cached_vt_verdict(self, domain: str) -> Optional[Dict[str, Any]]:
+        """Unexpired cached VirusTotal verdict for domain, if any"""
+        cached = self._vt_cache.get(domain)
+        if cached and time.monotonic() - cached[0] < VT_CACHE_TTL:
+            return cached[1]
+        return None
+
+    def _store_vt_verdict(self, domain: str, status_code: int, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Turn a VirusTotal domain response into a verdict, caching 200/404 answers"""
+        if status_code == 200:
+            stats = data['data']['attributes']['last_analysis_stats']
+            malicious = stats.get('malicious', 0)
+            suspicious = stats.get('suspicious', 0)
+            
+            result = {
+                "is_malicious": malicious > 0 or suspicious > 3,
+                "malicious_count": malicious,
+                "details": f"Vendors: {malicious} malicious, {suspicious} suspicious"
+            }
+        else:
+            result = {"is_malicious": False, "malicious_count": 0, "details": "No data"}
+        
+        # Rate limits / server errors are retried on the next lookup
+        if status_code in (200, 404):
+            self._vt_cache[domain] = (time.monotonic(), result)
+        return result
+
     def _check_virustotal(self, domain: str) -> Dict[str, Any]:
-        """Check a domain against VirusTotal API"""
-        import requests
-        url = f"https://www.virustotal.com/api/v3/domains/{domain}"
-        headers = {
-            "accept": "application/json",
-            "x-apikey": self.vt_api_key
-        }
+        """Check a domain against VirusTotal API (cached per domain)"""
+        cached = self._cached_vt_verdict(domain)
+        if cached is not None:
+            return cached
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                stats = data['data']['attributes']['last_analysis_stats']
-                malicious = stats.get('malicious', 0)
-                suspicious = stats.get('suspicious', 0)
-                
-                return {
-                    "is_malicious": malicious > 0 or suspicious > 3,
-                    "malicious_count": malicious,
-                    "details": f"Vendors: {malicious} malicious, {suspicious} suspicious"
-                }
-            return {"is_malicious": False, "malicious_count": 0, "details": "No data"}
+            response = self._get_vt_session().get(f"{VT_DOMAIN_URL}/{domain}", timeout=10)
+            return self._store_vt_verdict(domain, response.status_code,
+                                          response.json() if response.status_code == 200 else None)
         except Exception as e:
+            # Transient failures are not cached
             print(f"VirusTotal lookup failed: {str(e)}")
             return {"is_malicious": False, "malicious_count": 0, "details": "Lookup Error"}
 
-    def _detect_sensitive_data(self, text: str) -> List[str]:
-        """Detect sensitive data patterns in payload"""
-        found = []
+    async def _check_virustotal_async(self, client, domain: str) -> Dict[str, Any]:
+        """_check_virustotal over a shared httpx.AsyncClient"""
+        cached = self._cached_vt_verdict(domain)
+        if cached is not None:
+            return cached
         
-        for data_type, pattern in SENSITIVE_PATTERNS.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                found.append(data_type)
+        try:
+            response = await client.get(f"{VT_DOMAIN_URL}/{domain}", timeout=10)
+            return self._store_vt_verdict(domain, response.status_code,
+                                          response.json() if response.status_code == 200 else None)
+        except Exception as e:
+            print(f"VirusTotal lookup failed: {str(e)}")
+            return {"is_malicious": False, "malicious_count": 0, "details": "Lookup Error"}
+
+    def _unlisted_domains(self, log_entries: List[Dict[str, Any]]) -> set:
+        """Distinct domains in a batch that are neither approved nor known AI services"""
+        urls = [entry.get("request_url", "") for entry in log_entries]
+        labels = categorize_urls(urls, self._domain_categories)
+        return {
+            domain for domain in (_split_url(url)[0] for url, label in zip(urls, labels)
+                                  if label not in ("approved", "external_ai"))
+            if domain
+        }
+
+    def _prefetch_virustotal(self, log_entries: List[Dict[str, Any]], max_workers: int = 8):
+        """Look up each distinct unlisted domain of a batch once, concurrently, into the VT cache"""
+        if not self.vt_api_key:
+            return
+        domains = self._unlisted_domains(log_entries)
+        if len(domains) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(domains))) as executor:
+                list(executor.map(self._check_virustotal, domains))
+
+    async def _prefetch_virustotal_async(self, log_entries: List[Dict[str, Any]], semaphore: asyncio.Semaphore):
+        """_prefetch_virustotal with one pooled httpx.AsyncClient for the batch"""
+        if not self.vt_api_key:
+            return
+        domains = self._unlisted_domains(log_entries)
+        if not domains:
+            return
         
-        return found
+        import httpx
+        async def lookup(client, domain: str):
+            async with semaphore:
+                await self._check_virustotal_async(client, domain)
+        
+        # The client (and its connections) lives only as long as this event loop
+        headers = {"accept": "application/json", "x-apikey": self.vt_api_key}
+        async with httpx.AsyncClient(headers=headers, limits=httpx.Limits(max_connections=64)) as client:
+            await asyncio.gather(*(lookup(client, domain) for domain in domains))
+
+    def _detect_sensitive_data(self, text: Union[str, bytes]) -> List[str]:
+        """Detect sensitive data patterns in payload"""
+        # Payloads without any anchor character skip the scan and the memo cache
+        if not text or not maybe_sensitive(text):
+            return []
+        return list(_sensitive_types(text))
     
-    def _llm_analysis(self, log_entry: Dict[str, Any], 
-                      detected_sensitive: List[str],
-                      dept_risk: str) -> Dict[str, Any]:
-        """
-        Use LLM (OpenAI or Ollama) to perform deep analysis of the request
-        """
-        # Prepare context
-        analysis_context = f"""
+    @staticmethod
+    def _llm_context(log_entry: Dict[str, Any], detected_sensitive: List[str], dept_risk: str) -> str:
+        """User prompt describing one request for the non-agentic LLM analysis"""
+        return f"""
 NETWORK REQUEST DETAILS:
 - URL: {log_entry.get('request_url')}
 - User: {log_entry.get('user_id')}
 - Department: {log_entry.get('department')} (Risk Level: {dept_risk})
 - Payload Size: {log_entry.get('payload_size_kb')} KB
-- Payload Content: "{log_entry.get('payload_snippet')}"
+- Payload Content: "{_as_text(log_entry.get('payload_snippet'))}"
 - Pre-detected Sensitive Data: {', '.join(detected_sensitive) if detected_sensitive else 'None'}
 
 Analyze this request and provide a risk assessment.
 """
+
+    def _llm_cache_key(self, log_entry: Dict[str, Any], dept_risk: str) -> bytes:
+        """Content hash of everything in the prompt that bears on the verdict"""
+        key = orjson.dumps([self.provider, self.model, log_entry.get("request_url"),
+                            log_entry.get("payload_snippet"), log_entry.get("payload_size_kb"), dept_risk],
+                           default=str)
+        return hashlib.blake2b(key, digest_size=16).digest()
+
+    def _cached_llm_result(self, key: bytes, log_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Copy of a cached verdict attached to this log entry, if the content was seen before"""
+        with self._llm_cache_lock:
+            cached = self._llm_cache.get(key)
+            if cached is None:
+                return None
+            self._llm_cache.move_to_end(key)
+        return {**cached, "log_entry": log_entry}
+
+    def _llm_result(self, log_entry: Dict[str, Any], result: Dict[str, Any], key: bytes = None) -> Dict[str, Any]:
+        """Attach request metadata to a parsed LLM verdict (and cache it without the entry)"""
+        result["analysis_method"] = f"{self.provider}_analysis"
+        # Derive a missing category from the score the model did return
+        if not result.get("risk_category") and isinstance(result.get("risk_score"), (int, float)):
+            result["risk_category"] = category_for_score(result["risk_score"])
+        if key is not None:
+            with self._llm_cache_lock:
+                self._llm_cache[key] = dict(result)
+                if len(self._llm_cache) > LLM_ANALYSIS_CACHE_SIZE:
+                    self._llm_cache.popitem(last=False)
+        result["log_entry"] = log_entry
+        return result
+
+    def _llm_fallback(self, log_entry: Dict[str, Any], detected_sensitive: List[str], e: Exception) -> Dict[str, Any]:
+        """Conservative assessment used when the LLM call or its parsing fails"""
+        return {
+            "log_entry": log_entry,
+            "risk_category": "MEDIUM_RISK",
+            "risk_score": 50,
+            "reasoning": f"{self.provider.upper()} analysis failed: {str(e)}. Applying conservative risk assessment.",
+            "detected_sensitive_data": detected_sensitive,
+            "recommended_action": "Manual review required",
+            "user_message": None,
+            "analysis_method": "fallback",
+            "error": str(e)
+        }
+
+    def _llm_analysis(self, log_entry: Dict[str, Any], 
+                      detected_sensitive: List[str],
+                      dept_risk: str) -> Dict[str, Any]:
+        """
+        Use LLM (OpenAI or Ollama) to perform deep analysis of the request
+        """
+        key = self._llm_cache_key(log_entry, dept_risk)
+        cached = self._cached_llm_result(key, log_entry)
+        if cached is not None:
+            return cached
+        analysis_context = self._llm_context(log_entry, detected_sensitive, dept_risk)
         
         try:
             if self.provider == "ollama":
                 result = self._call_ollama(analysis_context)
             else:
                 result = self._call_openai(analysis_context)
-            
-            # Add metadata
-            result["log_entry"] = log_entry
-            result["analysis_method"] = f"{self.provider}_analysis"
-            
-            return result
-            
+            return self._llm_result(log_entry, result, key)
         except Exception as e:
             # Fallback to conservative assessment on error
-            return {
-                "log_entry": log_entry,
-                "risk_category": "MEDIUM_RISK",
-                "risk_score": 50,
-                "reasoning": f"{self.provider.upper()} analysis failed: {str(e)}. Applying conservative risk assessment.",
-                "detected_sensitive_data": detected_sensitive,
-                "recommended_action": "Manual review required",
-                "user_message": None,
-                "analysis_method": "fallback",
-                "error": str(e)
-            }
-    
-    def _call_openai(self, context: str) -> Dict[str, Any]:
-        """Call OpenAI API"""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": get_detection_prompt(APPROVED_DOMAINS, EXTERNAL_AI_SERVICES)
-                },
+            return self._llm_fallback(log_entry, detected_sensitive, e)
+
+    async def _llm_analysis_async(self, client, pending: _PendingLLM) -> Dict[str, Any]:
+        """_llm_analysis over a per-batch async OpenAI / Ollama client"""
+        key = self._llm_cache_key(pending.log_entry, pending.dept_risk)
+        cached = self._cached_llm_result(key, pending.log_entry)
+        if cached is not None:
+            return cached
+        analysis_context = self._llm_context(*pending)
+        
+        try:
+            if self.provider == "ollama":
+                response = await client.chat(**self._ollama_request(analysis_context))
+                result = self._parse_ollama_reply(response['message']['content'])
+            else:
+                response = await client.chat.completions.create(**self._openai_request(analysis_context))
+                result = orjson.loads(response.choices[0].message.content)
+            return self._llm_result(pending.log_entry, result, key)
+        except Exception as e:
+            return self._llm_fallback(pending.log_entry, pending.detected_sensitive, e)
+
+    def _async_llm_client(self):
+        """Async LLM client for one batch; its connections must not outlive the event loop"""
+        if self.provider == "ollama":
+            return self.ollama_client.AsyncClient()
+        if self.client is None:
+            return None
+        import openai
+        return openai.AsyncOpenAI(api_key=self.api_key)
+
+    async def _close_async_llm_client(self, client):
+        """Release a per-batch async LLM client's connection pool"""
+        if self.provider == "ollama":
+            # ollama.AsyncClient has no close(); its pool is the wrapped httpx.AsyncClient
+            await client._client.aclose()
+        else:
+            await client.close()
+
+    def _openai_request(self, context: str) -> Dict[str, Any]:
+        """Chat completion arguments for the OpenAI analysis call"""
+        return {
+            "model": self.model,
+            "messages": [
+                _OPENAI_SYSTEM_MESSAGE,
                 {
                     "role": "user",
                     "content": context
                 }
             ],
-            temperature=0.1,
-            max_tokens=500,
-            response_format={"type": "json_object"}
-        )
-        
-        return json.loads(response.choices[0].message.content)
+            "temperature": 0.1,
+            "max_tokens": 500,
+            "response_format": {"type": "json_object"}
+        }
     
-    def _call_ollama(self, context: str) -> Dict[str, Any]:
-        """Call Ollama (local LLM)"""
-        system_prompt = get_detection_prompt(APPROVED_DOMAINS, EXTERNAL_AI_SERVICES)
-        
-        full_prompt = f"""{system_prompt}
-
-{context}
-
-Respond with ONLY valid JSON in this exact format:
-{{
-  "risk_category": "APPROVED or LOW_RISK or MEDIUM_RISK or HIGH_RISK or CRITICAL",
-  "risk_score": 0-100,
-  "reasoning": "Brief explanation",
-  "detected_sensitive_data": ["list of data types"],
-  "recommended_action": "Action to take",
-  "user_message": "Message for user or null"
-}}"""
+    def _call_openai(self, context: str) -> Dict[str, Any]:
+        """Call OpenAI API"""
+        response = self.client.chat.completions.create(**self._openai_request(context))
         
-        response = self.ollama_client.chat(
-            model=self.model,
-            messages=[
+        return orjson.loads(response.choices[0].message.content)
+    
+    def _ollama_request(self, context: str) -> Dict[str, Any]:
+        """Chat arguments for the Ollama analysis call"""
+        return {
+            "model": self.model,
+            "messages": [
                 {
                     "role": "user",
-                    "content": full_prompt
+                    "content": _OLLAMA_PROMPT_PREFIX + context + _OLLAMA_PROMPT_SUFFIX
                 }
             ],
-            options={
+            "options": {
                 "temperature": 0.1,
                 "num_predict": 500
             }
-        )
-        
-        # Extract JSON from response
-        response_text = response['message']['content']
-        
+        }
+    
+    @staticmethod
+    def _parse_ollama_reply(response_text: str) -> Dict[str, Any]:
+        """Extract the JSON verdict from an Ollama reply"""
         # Try to parse JSON directly
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError:
+            return orjson.loads(response_text)
+        except orjson.JSONDecodeError:
             # Try to extract JSON from markdown code blocks
-            import re
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
+            json_match = _FENCED_JSON_RE.search(response_text)
             if json_match:
-                return json.loads(json_match.group(1))
+                return orjson.loads(json_match.group(1))
             
             # If still can't parse, try to find JSON object
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            json_match = _BARE_JSON_RE.search(response_text)
             if json_match:
-                return json.loads(json_match.group(0))
+                return orjson.loads(json_match.group(0))
             
             raise ValueError(f"Could not parse JSON from Ollama response: {response_text}")
     
-    def get_analytics(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _call_ollama(self, context: str) -> Dict[str, Any]:
+        """Call Ollama (local LLM)"""
+        response = self.ollama_client.chat(**self._ollama_request(context))
+        
+        # Extract JSON from response
+        return self._parse_ollama_reply(response['message']['content'])
+    
+    @staticmethod
+    def get_analytics(results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Generate advanced analytics from batch results
         """
         if not results:
             return {}
+        if len(results) < ANALYTICS_VECTORIZE_MIN:
+            return GhostAIDetector._get_analytics_small(results)
             
-        df = pd.DataFrame([
-            {
-                "category": r.get("risk_category", "UNKNOWN"),
-                "score": r.get("risk_score", 0),
-                "dept": r.get("log_entry", {}).get("department", "Unknown"),
-                "sensitive": len(r.get("pre_analysis", {}).get("detected_sensitive", [])),
-                "method": r.get("analysis_method", "Fast-track")
-            } for r in results
-        ])
+        # Pre-screening metadata is attached to the log entry by analyze_request
+        sensitive_lists = [
+            (r.get("pre_analysis") or r.get("log_entry", {}).get("pre_analysis", {})).get("detected_sensitive", [])
+            for r in results
+        ]
+        n = len(results)
+        categories = [r.get("risk_category", "UNKNOWN") for r in results]
+        departments = [r.get("log_entry", {}).get("department", "Unknown") for r in results]
+        # Missing / unparseable scores become NaN and are skipped like pandas' mean()
+        scores = np.array([r.get("risk_score", 0) for r in results], dtype=float)
+        scored = ~np.isnan(scores)
         
         # Risk distribution
-        risk_dist = df["category"].value_counts().to_dict()
+        risk_dist = dict(Counter(categories))
         
-        # Dept risk level (average score)
-        dept_risk = df.groupby("dept")["score"].mean().to_dict()
+        # Dept risk level (average score): integer-code departments in first-seen order, then bincount
+        dept_index: Dict[str, int] = {}
+        dept_codes = np.fromiter((dept_index.setdefault(d, len(dept_index)) for d in departments),
+                                 dtype=np.intp, count=n)
+        dept_sums = np.bincount(dept_codes[scored], weights=scores[scored], minlength=len(dept_index))
+        dept_counts = np.bincount(dept_codes[scored], minlength=len(dept_index))
+        dept_risk = {
+            dept: dept_sums[i] / dept_counts[i] if dept_counts[i] else np.nan
+            for dept, i in dept_index.items()
+        }
         
         # Sensitive data types captured
-        sensitive_types = {}
-        for r in results:
-            for s in r.get("pre_analysis", {}).get("detected_sensitive", []):
-                sensitive_types[s] = sensitive_types.get(s, 0) + 1
+        sensitive_types = dict(Counter(chain.from_iterable(sensitive_lists)))
                 
         return {
             "risk_distribution": risk_dist,
             "department_risk": dept_risk,
             "sensitive_exfiltration_breakdown": sensitive_types,
-            "total_threats": len(df[df["score"] > 40]),
-            "avg_risk_score": df["score"].mean()
+            "total_threats": int(np.count_nonzero(scores > 40)),
+            "avg_risk_score": scores[scored].mean() if scored.any() else np.nan
         }
 
-    def batch_analyze(self, log_entries: List[Dict[str, Any]], use_agent: bool = False) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _get_analytics_small(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Single-pass get_analytics for typical batch sizes, without array setup"""
+        risk_dist = Counter()
+        dept_scores = defaultdict(list)
+        sensitive_types = Counter()
+        total = 0.0
+        scored = 0
+        threats = 0
+        
+        for r in results:
+            log_entry = r.get("log_entry", {})
+            risk_dist[r.get("risk_category", "UNKNOWN")] += 1
+            sensitive_types.update(
+                (r.get("pre_analysis") or log_entry.get("pre_analysis", {})).get("detected_sensitive", [])
+            )
+            scores = dept_scores[log_entry.get("department", "Unknown")]
+            score = r.get("risk_score", 0)
+            if score is None:
+                continue
+            score = float(score)
+            if score != score:  # NaN
+                continue
+            scores.append(score)
+            total += score
+            scored += 1
+            threats += score > 40
+        
+        return {
+            "risk_distribution": dict(risk_dist),
+            "department_risk": {d: sum(v) / len(v) if v else math.nan for d, v in dept_scores.items()},
+            "sensitive_exfiltration_breakdown": dict(sensitive_types),
+            "total_threats": threats,
+            "avg_risk_score": total / scored if scored else math.nan
+        }
+
+    def batch_analyze(self, log_entries: Iterable[Dict[str, Any]], use_agent: bool = False,
+                      max_workers: int = None) -> List[Dict[str, Any]]:
         """
         Analyze multiple log entries
         
+        Rule-based screening (and VirusTotal / non-agentic LLM calls) runs on a
+        thread pool; entries that need the agent are sent as one LLM batch.
+        Must not be called from a running event loop; use batch_analyze_async there.
+        
+        Args:
+            log_entries: Log entry dictionaries (a list, or e.g. iter_logs_from_file)
+            use_agent: Whether to use agentic orchestration
+            max_workers: Thread pool size (defaults to SENTINEL_CONCURRENCY)
+            
+        Returns:
+            List of analysis results, in the same order as log_entries
+        """
+        results = dict(self.stream_analyze(log_entries, use_agent=use_agent, max_workers=max_workers))
+        return [results[i] for i in range(len(results))]
+    
+    def stream_analyze(self, log_entries: Iterable[Dict[str, Any]], use_agent: bool = False,
+                       max_workers: int = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield (index, result) pairs as each log entry finishes
+        
+        Screened entries are yielded in completion order; entries that need the
+        agent are collected and yielded after their single LLM batch returns.
+        Pass max_workers=1 to screen serially on the calling thread. A lazy
+        iterable is consumed as it is screened, so parsing overlaps with I/O.
+        """
+        workers = max_workers or DEFAULT_CONCURRENCY
+        if isinstance(log_entries, Sized):
+            workers = min(workers, len(log_entries))
+            # Needs a second pass over the entries, so only for materialized batches
+            self._prefetch_virustotal(log_entries)
+        pending = []
+        
+        if workers <= 1:
+            for i, entry in enumerate(log_entries):
+                result = self._screen_request(entry, use_agent=use_agent)
+                if result is None:
+                    pending.append((i, entry))
+                else:
+                    yield i, result
+        else:
+            # Each entry is dominated by blocking HTTP calls, so threads overlap them.
+            # The default-sized pool lives with the detector; other sizes get a temporary one.
+            if max_workers is None or max_workers == DEFAULT_CONCURRENCY:
+                pool = nullcontext(self._get_executor())
+            else:
+                pool = ThreadPoolExecutor(max_workers=workers)
+            with pool as executor:
+                # A bounded window of in-flight entries, so a lazy iterable is never read far ahead
+                entries = enumerate(log_entries)
+                window = workers * 2
+                futures = {}
+                while True:
+                    for i, entry in islice(entries, window - len(futures)):
+                        futures[executor.submit(self._screen_request, entry, use_agent)] = (i, entry)
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        i, entry = futures.pop(future)
+                        result = future.result()
+                        if result is None:
+                            pending.append((i, entry))
+                        else:
+                            yield i, result
+        
+        if pending:
+            pending.sort(key=lambda item: item[0])
+            agent_results = self.agent.run_batch([entry for _, entry in pending])
+            yield from zip((i for i, _ in pending), agent_results)
+    
+    async def analyze_request_async(self, log_entry: Dict[str, Any], use_agent: bool = False) -> Dict[str, Any]:
+        """Async analyze_request: VirusTotal and LLM calls are awaited instead of blocking"""
+        return (await self.batch_analyze_async([log_entry], use_agent=use_agent))[0]
+
+    async def batch_analyze_async(self, log_entries: List[Dict[str, Any]], use_agent: bool = False,
+                                  concurrency: int = DEFAULT_CONCURRENCY) -> List[Dict[str, Any]]:
+        """
+        Analyze multiple log entries concurrently
+        
+        VirusTotal lookups go through one httpx.AsyncClient and non-agentic LLM
+        calls through one async OpenAI / Ollama client per batch; rule-based
+        screening runs in worker threads.
+        
         Args:
             log_entries: List of log entry dictionaries
             use_agent: Whether to use agentic orchestration
+            concurrency: Maximum number of requests in flight at once
             
         Returns:
-            List of analysis results
+            List of analysis results, in the same order as log_entries
         """
-        results = []
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        await self._prefetch_virustotal_async(log_entries, semaphore)
+        
+        async def screen_one(entry: Dict[str, Any]):
+            async with semaphore:
+                return await asyncio.to_thread(self._screen_request, entry, use_agent, True)
         
-        for entry in log_entries:
-            result = self.analyze_request(entry, use_agent=use_agent)
-            results.append(result)
+        results = list(await asyncio.gather(*(screen_one(entry) for entry in log_entries)))
+        
+        deferred = [i for i, result in enumerate(results) if isinstance(result, _PendingLLM)]
+        if deferred:
+            client = self._async_llm_client()
+            
+            async def analyze_one(pending: _PendingLLM) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._llm_analysis_async(client, pending)
+            
+            try:
+                analyses = await asyncio.gather(*(analyze_one(results[i]) for i in deferred))
+            finally:
+                if client is not None:
+                    await self._close_async_llm_client(client)
+            for i, result in zip(deferred, analyses):
+                results[i] = result
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            agent_results = await self.agent.arun_batch([log_entries[i] for i in pending],
+                                                        max_concurrency=max(1, concurrency))
+            for i, result in zip(pending, agent_results):
+                results[i] = result
         
         return results
     
     @staticmethod
     def load_logs_from_file(filepath: str) -> List[Dict[str, Any]]:
-        """Load log entries from JSON file"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load log entries from a JSON array or JSON-lines (.jsonl / .ndjson) file"""
+        return list(GhostAIDetector.iter_logs_from_file(filepath))
+
+    @staticmethod
+    def iter_logs_from_file(filepath: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield log entries one at a time
+        
+        JSON-lines files are parsed line by line; JSON arrays are streamed
+        with ijson when it is installed, otherwise parsed in one go.
+        """
+        with open(filepath, 'rb') as f:
+            if filepath.endswith((".jsonl", ".ndjson")):
+                for line in f:
+                    if line.strip():
+                        yield orjson.loads(line)
+            elif IJSON_AVAILABLE:
+                yield from ijson.items(f, "item", use_float=True)
+            else:
+                yield from orjson.loads(f.read())
+
+# Backward-compatible name; there is a single detector implementation
+ShadowAIDetector = GhostAIDetector
@@ -3,11 +3,26 @@ AI Sentinel - Notification System
 Handles alerts to security teams via Slack and Microsoft Teams.
 """
 
+import atexit
 import logging
-from typing import Dict, Any
+import queue
+import threading
+import time
+from typing import Dict, Any, Optional
 
 logger = logging.getLogger("AI-Sentinel-Notifications")
 
+# Templates are built once; only the substitution happens per alert
+SLACK_ALERT_TEMPLATE = (
+    "💬 SLACK ALERT SENT:\n"
+    "%s *AI SECURITY ALERT*\n"
+    "*User:* %s\n"
+    "*Risk:* %s\n"
+    "*Reasoning:* %s\n"
+    "*Action Taken:* Automated analysis triggered"
+)
+TEAMS_ALERT_TEMPLATE = "📧 TEAMS ALERT SENT for User: %s (Risk: %s)"
+
 class NotificationManager:
     """Sends high-priority alerts to security channels"""
     
@@ -16,16 +31,9 @@ class NotificationManager:
         """
         Simulate sending a rich Slack message
         """
-        emoji = "🔴" if risk_category == "CRITICAL" else "🟠"
-        message = (
-            f"{emoji} *AI SECURITY ALERT*\n"
-            f"*User:* {user_id}\n"
-            f"*Risk:* {risk_category}\n"
-            f"*Reasoning:* {reasoning}\n"
-            f"*Action Taken:* Automated analysis triggered"
-        )
-        
-        logger.info(f"💬 SLACK ALERT SENT:\n{message}")
+        if logger.isEnabledFor(logging.INFO):
+            emoji = "🔴" if risk_category == "CRITICAL" else "🟠"
+            logger.info(SLACK_ALERT_TEMPLATE, emoji, user_id, risk_category, reasoning)
         return True
 
     @staticmethod
@@ -33,15 +41,73 @@ class NotificationManager:
         """
         Simulate sending a Microsoft Teams Adaptive Card
         """
-        logger.info(f"📧 TEAMS ALERT SENT for User: {user_id} (Risk: {risk_category})")
+        logger.info(TEAMS_ALERT_TEMPLATE, user_id, risk_category)
         return True
 
+# Alerts are delivered by one daemon thread so the analysis path never waits on them
+ALERT_QUEUE_SIZE = 10_000
+# Seconds the interpreter waits at exit for queued alerts to be delivered
+ALERT_FLUSH_TIMEOUT = 5.0
+_alert_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=ALERT_QUEUE_SIZE)
+_alert_worker = None
+_alert_worker_lock = threading.Lock()
+
+def _drain_alerts():
+    """Deliver queued alerts to every channel, forever"""
+    while True:
+        risk, user, reason = _alert_queue.get()
+        try:
+            NotificationManager.send_slack_alert(risk, user, reason)
+            NotificationManager.send_teams_alert(risk, user, reason)
+        except Exception:
+            logger.exception("Alert delivery failed for user %s", user)
+        finally:
+            _alert_queue.task_done()
+
+def _ensure_alert_worker():
+    """Start the delivery thread on first use"""
+    global _alert_worker
+    if _alert_worker is None:
+        with _alert_worker_lock:
+            if _alert_worker is None:
+                _alert_worker = threading.Thread(target=_drain_alerts, name="sentinel-alerts", daemon=True)
+                _alert_worker.start()
+
+def _enqueue_alert(alert: tuple):
+    """Queue an alert, dropping the oldest pending one when the queue is full"""
+    while True:
+        try:
+            _alert_queue.put_nowait(alert)
+            return
+        except queue.Full:
+            try:
+                _alert_queue.get_nowait()
+                _alert_queue.task_done()
+                logger.warning("Alert queue full; dropped oldest alert")
+            except queue.Empty:
+                pass
+
+def flush_alerts(timeout: Optional[float] = None) -> bool:
+    """Block until every queued alert has been delivered, or timeout seconds pass; True if drained"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _alert_queue.all_tasks_done:
+        while _alert_queue.unfinished_tasks:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                logger.warning("%d alerts undelivered at flush timeout", _alert_queue.unfinished_tasks)
+                return False
+            _alert_queue.all_tasks_done.wait(remaining)
+    return True
+
+# The worker is a daemon thread, so give pending alerts a bounded chance to go out at exit
+atexit.register(flush_alerts, ALERT_FLUSH_TIMEOUT)
+
 def broadcast_alert(analysis_result: Dict[str, Any]):
-    """Broadcast alert to all configured channels"""
+    """Queue an alert for all configured channels (delivered in the background)"""
     risk = analysis_result.get("risk_category")
     if risk in ["HIGH_RISK", "CRITICAL"]:
         user = analysis_result.get("log_entry", {}).get("user_id", "Unknown")
         reason = analysis_result.get("reasoning", "No details")
         
-        NotificationManager.send_slack_alert(risk, user, reason)
-        NotificationManager.send_teams_alert(risk, user, reason)
+        _ensure_alert_worker()
+        _enqueue_alert((risk, user, reason))
@@ -2,6 +2,22 @@
 Defines approved AI tools, data classification, and risk assessment rules.
 """
 import os
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Optional: Hyperscan matches every sensitive pattern in a single SIMD pass
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
 
 # Approved AI endpoints (sanctioned by the organization)
 # Load from environment variable (comma-separated) or use defaults
@@ -35,14 +51,162 @@ MALICIOUS_DOMAINS = [
     "data-exfiltration-test.org"
 ]
 
+def domain_suffixes(domains: list) -> frozenset:
+    """Normalize a domain list (lowercase, no trailing dot) for matches_domain"""
+    return frozenset(d.strip().lower().rstrip(".") for d in domains if d.strip())
+
+def matches_domain(host: str, domains: frozenset) -> bool:
+    """True if host is one of domains or a subdomain of one (one set probe per label)"""
+    while host:
+        if host in domains:
+            return True
+        _, _, host = host.partition(".")
+    return False
+
+def build_domain_categories(**domains_by_category: list) -> dict:
+    """Reverse map from normalized domain to the categories that list it"""
+    categories = {}
+    for category, domains in domains_by_category.items():
+        for domain in domain_suffixes(domains):
+            categories[domain] = categories.get(domain, frozenset()) | {category}
+    return categories
+
+# Interned once so domain strings shared across modules compare by identity
+APPROVED_DOMAINS = [sys.intern(d) for d in APPROVED_DOMAINS]
+EXTERNAL_AI_SERVICES = [sys.intern(d) for d in EXTERNAL_AI_SERVICES]
+MALICIOUS_DOMAINS = [sys.intern(d) for d in MALICIOUS_DOMAINS]
+
+# Domain -> categories ("approved", "external_ai", "malicious"), so one walk classifies a host
+ALL_DOMAINS_BY_CATEGORY = build_domain_categories(
+    approved=APPROVED_DOMAINS, external_ai=EXTERNAL_AI_SERVICES, malicious=MALICIOUS_DOMAINS
+)
+
+def domain_categories(host: str, categories: dict = ALL_DOMAINS_BY_CATEGORY) -> frozenset:
+    """Categories host belongs to, itself or as a subdomain (one dict probe per label)"""
+    found = frozenset()
+    while host:
+        hit = categories.get(host)
+        if hit:
+            found |= hit
+        _, _, host = host.partition(".")
+    return found
+
+# First listed category wins when a host is in several. Matches screening: an approved host
+# is fast-tracked and known AI services skip VirusTotal even if also listed as malicious
+CATEGORY_PRIORITY = ("approved", "external_ai", "malicious")
+
+def primary_category(found: frozenset) -> Optional[str]:
+    """Highest-priority category among found, or None if empty"""
+    return next((category for category in CATEGORY_PRIORITY if category in found), None)
+
+def classify_url(url: str, categories: dict = ALL_DOMAINS_BY_CATEGORY) -> Optional[str]:
+    """Highest-priority category of the URL's host, or None if it is unlisted"""
+    try:
+        host = (urlsplit(url if "//" in url else f"//{url}").hostname or "").rstrip(".")
+    except ValueError:
+        return None
+    return primary_category(domain_categories(host, categories))
+
 # Sensitive data patterns (regex-based detection)
-SENSITIVE_PATTERNS = {
-    "iban": r"[A-Z]{2}[0-9]{2}[A-Z0-9]{1,30}",
+# Repeats that can restart at every position are bounded (RFC 5321 local-part length) and
+# anchored, and phone digit groups need a separator, so scanning stays linear
+SENSITIVE_PATTERN_SOURCES = {
+    "iban": r"\b[A-Z]{2}[0-9]{2}[A-Z0-9]{11,30}\b",
     "account_number": r"\b\d{8,12}\b",
-    "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b",
-    "phone": r"\b\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}\b",
-    "monetary_large": r"€\s*\d{1,3}(,\d{3})*(\.\d{2})?[KMB]?",
+    "email": r"\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]+\.[A-Za-z]{2,63}\b",
+    "phone": r"\b\+?\d{1,3}(?:[-.\s]\d{1,4}){2,4}\b",
+    "monetary_large": r"€\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?[KMB]?",
+}
+
+# Compiled once at import; ASCII classes keep \d, \s and \b identical to the Hyperscan database
+SENSITIVE_PATTERN_FLAGS = re.IGNORECASE | re.ASCII
+SENSITIVE_PATTERNS = {
+    name: re.compile(pattern, SENSITIVE_PATTERN_FLAGS) for name, pattern in SENSITIVE_PATTERN_SOURCES.items()
+}
+
+# All patterns fused into one alternation; match.lastgroup names the pattern that hit
+SENSITIVE_COMBINED_RE = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in SENSITIVE_PATTERN_SOURCES.items()),
+    SENSITIVE_PATTERN_FLAGS
+)
+
+# Same patterns over UTF-8 bytes, for payloads that arrive undecoded (bytes patterns are ASCII-only)
+SENSITIVE_PATTERNS_BYTES = {
+    name: re.compile(pattern.encode("utf-8"), re.IGNORECASE) for name, pattern in SENSITIVE_PATTERN_SOURCES.items()
 }
+SENSITIVE_COMBINED_RE_BYTES = re.compile(SENSITIVE_COMBINED_RE.pattern.encode("utf-8"), re.IGNORECASE)
+
+def _build_hyperscan_db(sources: dict):
+    """Compile all patterns into one block-mode Hyperscan database (None if unavailable)"""
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    # Caseless UTF-8 mode folds some non-ASCII letters (e.g. Kelvin sign), so it only scans ASCII text
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_SINGLEMATCH
+    try:
+        db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        db.compile(expressions=[p.encode("utf-8") for p in sources.values()],
+                   ids=list(range(len(sources))), elements=len(sources), flags=flags)
+    except hyperscan.error:
+        return None
+    return db
+
+SENSITIVE_HYPERSCAN_DB = _build_hyperscan_db(SENSITIVE_PATTERN_SOURCES)
+_SENSITIVE_NAMES = tuple(SENSITIVE_PATTERN_SOURCES)
+_hyperscan_local = threading.local()
+
+def hyperscan_sensitive_types(text: Union[str, bytes]) -> tuple:
+    """Sensitive data types in text via SENSITIVE_HYPERSCAN_DB (scratch space is per thread)"""
+    scratch = getattr(_hyperscan_local, "scratch", None)
+    if scratch is None:
+        scratch = _hyperscan_local.scratch = hyperscan.Scratch(SENSITIVE_HYPERSCAN_DB)
+    hits = set()
+
+    def on_match(id_, *_):
+        hits.add(id_)
+        # A truthy return halts the scan once every pattern has matched
+        return len(hits) == len(_SENSITIVE_NAMES)
+
+    data = text if isinstance(text, bytes) else text.encode("utf-8")
+    try:
+        SENSITIVE_HYPERSCAN_DB.scan(data, match_event_handler=on_match, scratch=scratch)
+    except hyperscan.ScanTerminated:
+        pass  # halted by on_match; hits is complete
+    return tuple(name for i, name in enumerate(_SENSITIVE_NAMES) if i in hits)
+
+# Every pattern needs an ASCII digit except email, which needs "@"
+SENSITIVE_ANCHOR_CHARS = "@0123456789"
+SENSITIVE_ANCHOR_BYTES = tuple(char.encode("ascii") for char in SENSITIVE_ANCHOR_CHARS)
+
+def maybe_sensitive(text: Union[str, bytes]) -> bool:
+    """Cheap pre-filter: False means no sensitive pattern can match text"""
+    anchors = SENSITIVE_ANCHOR_BYTES if isinstance(text, bytes) else SENSITIVE_ANCHOR_CHARS
+    return any(char in text for char in anchors)
+
+def scan_sensitive(text: Union[str, bytes]) -> tuple:
+    """
+    All sensitive data types found in text, in SENSITIVE_PATTERNS order, from a single scan where possible
+    UTF-8 bytes are scanned as-is, without decoding.
+    """
+    if not maybe_sensitive(text):
+        return ()
+    # Hyperscan folds some non-ASCII letters that re.ASCII does not, so non-ASCII text uses re
+    if SENSITIVE_HYPERSCAN_DB is not None and text.isascii():
+        return hyperscan_sensitive_types(text)
+    
+    is_bytes = isinstance(text, bytes)
+    combined = SENSITIVE_COMBINED_RE_BYTES if is_bytes else SENSITIVE_COMBINED_RE
+    patterns = SENSITIVE_PATTERNS_BYTES if is_bytes else SENSITIVE_PATTERNS
+    
+    # One fused pass; no hit means no individual pattern can match either
+    found = {match.lastgroup for match in combined.finditer(text)}
+    if not found:
+        return ()
+    
+    # Alternation matches don't overlap, so confirm the remaining types individually
+    return tuple(
+        data_type for data_type, pattern in patterns.items()
+        if data_type in found or pattern.search(text)
+    )
 
 # Department risk profiles
 DEPARTMENT_RISK_LEVELS = {
@@ -57,6 +221,8 @@ DEPARTMENT_RISK_LEVELS = {
     "Marketing": "low_sensitivity",
     "Product Management": "low_sensitivity"
 }
+# Interned so lookups with interned log values hit on identity
+DEPARTMENT_RISK_LEVELS = {sys.intern(name): level for name, level in DEPARTMENT_RISK_LEVELS.items()}
 
 # Risk categorization rules
 RISK_CATEGORIES = {
@@ -87,6 +253,28 @@ RISK_CATEGORIES = {
     }
 }
 
+@dataclass(frozen=True, slots=True)
+class RiskCategory:
+    """Immutable view of one RISK_CATEGORIES entry"""
+    name: str
+    description: str
+    action: str
+    score_range: Tuple[int, int]
+
+RISK_CATEGORY_POLICIES: Dict[str, RiskCategory] = {
+    sys.intern(name): RiskCategory(sys.intern(name), rule["description"], rule["action"], rule["score_range"])
+    for name, rule in RISK_CATEGORIES.items()
+}
+
+# Risk score (0-100) -> category name, so mapping a score is one array index
+RISK_SCORE_TO_CATEGORY = np.empty(101, dtype=object)
+for _policy in RISK_CATEGORY_POLICIES.values():
+    RISK_SCORE_TO_CATEGORY[_policy.score_range[0]:_policy.score_range[1] + 1] = _policy.name
+
+def category_for_score(score: float) -> str:
+    """Risk category whose score_range contains score (clamped to 0-100)"""
+    return RISK_SCORE_TO_CATEGORY[min(max(int(score), 0), 100)]
+
 # System prompt template for LLM analysis
 DETECTION_SYSTEM_PROMPT = """You are an AI security analyst for a leading financial institution.
 
@@ -119,7 +307,15 @@ Be strict but fair. The goal is to protect the organization's data while support
 
 def get_detection_prompt(approved_domains: list, external_services: list) -> str:
     """Generate the system prompt for GPT-4 analysis"""
+    return _format_detection_prompt(tuple(approved_domains), tuple(external_services))
+
+@lru_cache(maxsize=8)
+def _format_detection_prompt(approved_domains: tuple, external_services: tuple) -> str:
+    """Format the prompt once per distinct domain lists"""
     return DETECTION_SYSTEM_PROMPT.format(
         approved_domains=", ".join(approved_domains),
         external_services=", ".join(external_services)
     )
+
+# Prompt for the configured domain lists, formatted once at import
+DEFAULT_DETECTION_PROMPT = get_detection_prompt(APPROVED_DOMAINS, EXTERNAL_AI_SERVICES)
@@ -0,0 +1,115 @@
+"""
+AI Sentinel - LLM Response Cache
+Persists LLM replies in SQLite so identical prompts are only sent once.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+# Inserts between row-count checks, so the table may briefly exceed max_entries by this much
+EVICT_CHECK_EVERY = 1000
+# Cache hits whose recency is buffered in memory before being written in one statement
+TOUCH_FLUSH_EVERY = 256
+
+class ResponseCache:
+    """SQLite-backed cache of LLM verdicts (JSON text), keyed on a prompt hash"""
+
+    def __init__(self, path: str = "data/llm_cache.sqlite", max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = None
+        self._inserts = 0
+        self._touched: Dict[str, float] = {}
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Open the database on first use so unused caches never touch disk"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            # A lost cache write only costs a repeated LLM call, so skip the per-commit fsync
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses(accessed_at)")
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hash the model name and prompt parts into a cache key"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached entry for key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                # Recency is written in batches, not on every hit
+                self._touched[key] = time.time()
+                if len(self._touched) >= TOUCH_FLUSH_EVERY:
+                    self._flush_touched()
+                    self._conn.commit()
+        return row[0] if row else None
+
+    def _flush_touched(self):
+        """Write buffered access times (caller holds the lock and commits)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        """Delete the least recently used entries past max_entries (caller holds the lock and commits)"""
+        excess = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+
+    def set(self, key: str, content: str):
+        """Store an entry, evicting the least recently used entries past max_entries"""
+        with self._lock:
+            self._touched.pop(key, None)
+            self._flush_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, accessed_at) VALUES (?, ?, ?)",
+                (key, content, time.time())
+            )
+            # Counting is a full scan, so eviction is checked on the first and every Nth insert
+            if self._inserts % EVICT_CHECK_EVERY == 0:
+                self._evict()
+            self._inserts += 1
+            self._conn.commit()
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache at LLM_CACHE_PATH; set LLM_CACHE_PATH to an empty string to disable"""
+    global _default_cache
+    path = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+    if not path:
+        return None
+    with _default_lock:
+        if _default_cache is None or _default_cache.path != path:
+            _default_cache = ResponseCache(path)
+    return _default_cache
@@ -0,0 +1,68 @@
+"""
+AI Sentinel - Checksum Validators
+Confirms regex candidates for account numbers and IBANs before they count as sensitive data.
+"""
+
+import numpy as np
+
+# Optional: Numba compiles the digit loops to machine code
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Without Numba the validators run as plain Python"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+@njit(cache=True)
+def _luhn_ok(digits: np.ndarray) -> bool:
+    """Luhn checksum over an array of digit values (0-9)"""
+    total = 0
+    double = False
+    for i in range(digits.shape[0] - 1, -1, -1):
+        value = digits[i]
+        if double:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+        double = not double
+    return total % 10 == 0
+
+@njit(cache=True)
+def _iban_mod97_ok(chars: np.ndarray) -> bool:
+    """ISO 13616 mod-97 check over uppercase ASCII codes, country and check digits first"""
+    n = chars.shape[0]
+    remainder = 0
+    for j in range(n):
+        c = chars[(j + 4) % n]  # the first four characters move to the end
+        if 48 <= c <= 57:
+            remainder = (remainder * 10 + (c - 48)) % 97
+        elif 65 <= c <= 90:
+            remainder = (remainder * 100 + (c - 55)) % 97
+        else:
+            return False
+    return remainder == 1
+
+def luhn_valid(number: str) -> bool:
+    """True if an all-digit string passes the Luhn check"""
+    if not number.isdigit() or not number.isascii():
+        return False
+    return bool(_luhn_ok(np.frombuffer(number.encode("ascii"), dtype=np.uint8).astype(np.int64) - 48))
+
+def iban_valid(iban: str) -> bool:
+    """True if an IBAN (15-34 characters, spaces ignored) has valid check digits"""
+    compact = iban.replace(" ", "").upper()
+    if not 15 <= len(compact) <= 34 or not compact.isascii():
+        return False
+    return bool(_iban_mod97_ok(np.frombuffer(compact.encode("ascii"), dtype=np.uint8).astype(np.int64)))
+
+# Sensitive data type -> validator for its regex candidates
+CHECKSUM_VALIDATORS = {
+    "account_number": luhn_valid,
+    "iban": iban_valid,
+}
@@ -1,80 +1,308 @@
 
 import os
-from typing import List, Dict, Any
+import atexit
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import faiss
+import numpy as np
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
 
+# The exact flat index is swapped for IVF once there are enough vectors to train it
+IVF_NLIST = int(os.getenv("VECTOR_IVF_NLIST", "100"))
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "10"))
+# Optional product quantization of IVF vectors: m sub-quantizers of 8 bits (0 = store full vectors)
+IVF_PQ_M = int(os.getenv("VECTOR_IVF_PQ_M", "0"))
+# FAISS wants ~39 training points per centroid (and per PQ codeword)
+IVF_MIN_VECTORS = 39 * max(IVF_NLIST, 256 if IVF_PQ_M else 0)
+# Texts per model forward pass when embedding a batch of records
+EMBED_BATCH_SIZE = int(os.getenv("VECTOR_EMBED_BATCH_SIZE", "64"))
+# Embeddings persisted by content hash so repeated records skip the model (empty to disable)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embeddings_cache")
+EMBEDDING_MEMORY_CACHE_SIZE = 4096
+# Formatted search_context results kept per (query, k) until the next batch is indexed
+SEARCH_CACHE_SIZE = 1024
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# OpenMP threads for FAISS scans (0 = one per core)
+FAISS_THREADS = int(os.getenv("VECTOR_FAISS_THREADS", "0")) or os.cpu_count() or 1
+faiss.omp_set_num_threads(FAISS_THREADS)
+# Records added between writes of the index to disk (it is always written at exit)
+VECTOR_FLUSH_EVERY = int(os.getenv("VECTOR_FLUSH_EVERY", "500"))
+# Docstore id of the placeholder document a new index is bootstrapped with
+SEED_DOC_ID = "sentinel-system-seed"
+
 class SentinelVectorStore:
     """Manages the local FAISS vector database for AI Sentinel"""
     
     def __init__(self, index_path: str = "data/faiss_index"):
         self.index_path = index_path
         # Initialize the embedding model (all-MiniLM-L6-v2 is lightweight and effective)
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        self.embeddings = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            # Unit vectors make inner product equal to cosine similarity
+            encode_kwargs={"batch_size": EMBED_BATCH_SIZE, "normalize_embeddings": True}
+        )
+        self._embedding_cache = OrderedDict()
+        self._search_cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._pending_adds = 0
+        self._flush_thread = None
+        self._index_mapped = False
         self.vector_db = self._load_or_create_index()
+        self._seed_ids = [
+            doc_id for doc_id in self.vector_db.index_to_docstore_id.values()
+            if getattr(self.vector_db.docstore.search(doc_id), "metadata", {}).get("source") == "system"
+        ]
+        # Drop the placeholder while the index is still flat; IVF ids cannot be deleted
+        self._drop_seed()
+        self.vector_db.index = self._tune_index(self.vector_db.index)
+        atexit.register(self.flush)
 
     def _load_or_create_index(self):
         """Loads an existing FAISS index or creates a new one if it doesn't exist"""
         if os.path.exists(self.index_path):
             try:
                 print(f"📁 Loading existing Vector DB from {self.index_path}")
-                return FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
+                # LangChain's loader reads the whole index into memory; map it so pages load on demand
+                index = self._read_index(mmap=True)
+                with open(os.path.join(self.index_path, "index.pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                vector_db = FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+                # Indexes saved before the switch to inner product keep L2 search
+                if vector_db.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                    vector_db.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+                # Only IVF lists are mapped; a flat index is read in full regardless of the flag
+                self._index_mapped = isinstance(index, faiss.IndexIVF)
+                return vector_db
             except Exception as e:
                 print(f"⚠️ Error loading Vector DB: {str(e)}. Creating new one.")
         
         # Create a tiny initial index to avoid empty index errors
         print("✨ Creating new Vector DB index")
         initial_doc = Document(page_content="AI Sentinel System Initialization", metadata={"source": "system"})
-        return FAISS.from_documents([initial_doc], self.embeddings)
+        return FAISS.from_documents([initial_doc], self.embeddings, ids=[SEED_DOC_ID],
+                                    distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT)
+
+    def _read_index(self, mmap: bool = False):
+        """Read the saved FAISS index, memory-mapped if requested (mapped IVF lists are read-only)"""
+        return faiss.read_index(os.path.join(self.index_path, "index.faiss"), faiss.IO_FLAG_MMAP if mmap else 0)
+
+    def _ensure_writable(self):
+        """Swap a memory-mapped IVF index for an in-memory copy before its first write"""
+        # Mapped lists are read-only and cannot be cloned, so the file (still identical) is read in full
+        if self._index_mapped:
+            self.vector_db.index = self._tune_index(self._read_index())
+            self._index_mapped = False
+
+    def _drop_seed(self):
+        """Delete the placeholder document once real records exist, so searches never return it"""
+        # IVF ids are not renumbered on removal, which LangChain's delete assumes
+        if (not self._seed_ids or self.vector_db.index.ntotal <= len(self._seed_ids)
+                or isinstance(self.vector_db.index, faiss.IndexIVF)):
+            return
+        with self._lock:
+            self.vector_db.delete(self._seed_ids)
+            self._pending_adds += len(self._seed_ids)
+            self._seed_ids = []
 
     def add_log_entries(self, results: List[Dict[str, Any]]):
         """Converts analysis results into documents and adds them to the vector store"""
         if not results:
             return
 
-        documents = []
+        texts, metadatas = [], []
         for res in results:
             log = res.get("log_entry", {})
             # Construct a rich text representation for embedding
-            content = f"""
-            User: {log.get('user_id')}
-            Department: {log.get('department')}
-            URL: {log.get('request_url')}
-            Risk: {res.get('risk_category')} (Score: {res.get('risk_score')})
-            Reasoning: {res.get('reasoning')}
-            Detected PII: {', '.join(res.get('detected_sensitive_data', []))}
-            """
-            
+            texts.append("\n".join((
+                f"User: {log.get('user_id')}",
+                f"Department: {log.get('department')}",
+                f"URL: {log.get('request_url')}",
+                f"Risk: {res.get('risk_category')} (Score: {res.get('risk_score')})",
+                f"Reasoning: {res.get('reasoning')}",
+                f"Detected PII: {', '.join(res.get('detected_sensitive_data') or ())}"
+            )))
             # Store original result in metadata for rich retrieval
-            doc = Document(
-                page_content=content.strip(),
-                metadata={
-                    "user_id": str(log.get("user_id")),
-                    "department": str(log.get("department")),
-                    "risk_category": str(res.get("risk_category")),
-                    "timestamp": str(log.get("timestamp", ""))
-                }
-            )
-            documents.append(doc)
-
-        if documents:
-            self.vector_db.add_documents(documents)
-            self.vector_db.save_local(self.index_path)
-            print(f"✅ Indexed {len(documents)} new security records to FAISS.")
+            metadatas.append({
+                "user_id": str(log.get("user_id")),
+                "department": str(log.get("department")),
+                "risk_category": str(res.get("risk_category")),
+                "timestamp": str(log.get("timestamp", ""))
+            })
+
+        if texts:
+            vectors = self._embed_texts(texts)
+            with self._lock:
+                self._ensure_writable()
+                self.vector_db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+                self._drop_seed()
+                self.vector_db.index = self._tune_index(self.vector_db.index)
+                self._pending_adds += len(texts)
+                self._search_cache.clear()
+                if self._pending_adds >= VECTOR_FLUSH_EVERY:
+                    self._flush_in_background()
+            print(f"✅ Indexed {len(texts)} new security records to FAISS.")
+
+    def flush(self):
+        """Write pending additions to disk now"""
+        thread = self._flush_thread
+        if thread is not None:
+            thread.join()
+        self._save()
+
+    def _flush_in_background(self):
+        """Write the index on a daemon thread unless a write is already running"""
+        if self._flush_thread is not None and self._flush_thread.is_alive():
+            return
+        self._flush_thread = threading.Thread(target=self._save, name="sentinel-vector-flush", daemon=True)
+        self._flush_thread.start()
+
+    def _save(self):
+        """Snapshot the store under the lock, then write it to disk without blocking searches or adds"""
+        with self._save_lock:
+            with self._lock:
+                pending = self._pending_adds
+                if not pending:
+                    return
+                index_bytes = faiss.serialize_index(self.vector_db.index)
+                docstore = InMemoryDocstore(dict(self.vector_db.docstore._dict))
+                index_to_docstore_id = dict(self.vector_db.index_to_docstore_id)
+            
+            # Same files as FAISS.save_local, written to a temporary folder and moved over the
+            # index so readers never see a partial write
+            tmp_path = f"{self.index_path}.tmp"
+            try:
+                os.makedirs(tmp_path, exist_ok=True)
+                with open(os.path.join(tmp_path, "index.faiss"), "wb") as f:
+                    f.write(index_bytes.tobytes())
+                with open(os.path.join(tmp_path, "index.pkl"), "wb") as f:
+                    pickle.dump((docstore, index_to_docstore_id), f)
+                os.makedirs(self.index_path, exist_ok=True)
+                for name in ("index.pkl", "index.faiss"):
+                    os.replace(os.path.join(tmp_path, name), os.path.join(self.index_path, name))
+                os.rmdir(tmp_path)
+            except OSError as e:
+                print(f"⚠️ Could not save Vector DB: {str(e)}")
+                return
+            with self._lock:
+                # Records added while writing stay pending for the next flush
+                self._pending_adds -= pending
+
+    @staticmethod
+    def _embedding_key(text: str) -> str:
+        """Content hash of a record text for the embedding model in use"""
+        return hashlib.sha256(f"{EMBEDDING_MODEL}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _cached_embedding(self, key: str) -> Optional[np.ndarray]:
+        """Vector for key from memory, then from the on-disk cache, or None"""
+        with self._lock:
+            vector = self._embedding_cache.get(key)
+            if vector is not None:
+                self._embedding_cache.move_to_end(key)
+                return vector
+        if EMBEDDING_CACHE_DIR:
+            try:
+                vector = np.load(os.path.join(EMBEDDING_CACHE_DIR, key[:2], f"{key}.npy"))
+            except (OSError, ValueError):
+                return None
+            self._remember_embedding(key, vector)
+        return vector
+
+    def _remember_embedding(self, key: str, vector: np.ndarray):
+        """Keep a vector in the in-process LRU (shared by every session thread)"""
+        with self._lock:
+            self._embedding_cache[key] = vector
+            if len(self._embedding_cache) > EMBEDDING_MEMORY_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+
+    def _store_embedding(self, key: str, vector: np.ndarray):
+        """Cache a freshly computed vector in memory and on disk"""
+        self._remember_embedding(key, vector)
+        if not EMBEDDING_CACHE_DIR:
+            return
+        try:
+            directory = os.path.join(EMBEDDING_CACHE_DIR, key[:2])
+            os.makedirs(directory, exist_ok=True)
+            # Write then rename so readers never see a partial file
+            tmp_path = os.path.join(directory, f"{key}.tmp.npy")
+            np.save(tmp_path, vector)
+            os.replace(tmp_path, os.path.join(directory, f"{key}.npy"))
+        except OSError as e:
+            print(f"⚠️ Could not cache embedding: {str(e)}")
+
+    def _embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts in one batched model call, reusing cached vectors and embedding duplicates once"""
+        vectors, missing = {}, {}
+        for text in dict.fromkeys(texts):
+            key = self._embedding_key(text)
+            vector = self._cached_embedding(key)
+            if vector is None:
+                missing[text] = key
+            else:
+                vectors[text] = vector
+        
+        if missing:
+            for (text, key), vector in zip(missing.items(), self.embeddings.embed_documents(list(missing))):
+                vector = np.asarray(vector, dtype=np.float32)
+                vectors[text] = vector / max(float(np.linalg.norm(vector)), 1e-12)
+                self._store_embedding(key, vectors[text])
+        return [vectors[text] for text in texts]
+
+    @staticmethod
+    def _tune_index(index):
+        """Return an IVF (optionally PQ) copy of a large flat index (same metric, same ids), or the index unchanged"""
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = IVF_NPROBE
+            index.parallel_mode = 1  # split each query's probes across threads
+            return index
+        if IVF_NLIST <= 0 or not isinstance(index, faiss.IndexFlat) or index.ntotal < IVF_MIN_VECTORS:
+            return index
+        
+        vectors = index.reconstruct_n(0, index.ntotal)
+        quantizer = faiss.IndexFlat(index.d, index.metric_type)
+        if IVF_PQ_M:
+            ivf = faiss.IndexIVFPQ(quantizer, index.d, IVF_NLIST, IVF_PQ_M, 8, index.metric_type)
+        else:
+            ivf = faiss.IndexIVFFlat(quantizer, index.d, IVF_NLIST, index.metric_type)
+        ivf.train(vectors)
+        ivf.add(vectors)
+        ivf.nprobe = IVF_NPROBE
+        ivf.parallel_mode = 1
+        print(f"⚡ Converted Vector DB to {type(ivf).__name__} ({IVF_NLIST} lists, nprobe={IVF_NPROBE})")
+        return ivf
 
     def search_context(self, query: str, k: int = 5) -> str:
         """Searches the vector store and returns a formatted context string"""
+        # Only the placeholder document is indexed until the first records are added
+        if self.vector_db.index.ntotal <= len(self._seed_ids):
+            return "No relevant historical security records found."
+        # Repeated queries skip both the embedding model and the index scan
+        cache_key = (query, k)
+        with self._lock:
+            context = self._search_cache.get(cache_key)
+            if context is not None:
+                self._search_cache.move_to_end(cache_key)
+                return context
         try:
-            docs = self.vector_db.similarity_search(query, k=k)
+            # A placeholder that could not be deleted (IVF index) is filtered out instead
+            docs = [
+                doc for doc in self.vector_db.similarity_search(query, k=k + len(self._seed_ids))
+                if doc.metadata.get("source") != "system"
+            ][:k]
             if not docs:
                 return "No relevant historical security records found."
-            
-            context_parts = []
-            for doc in docs:
-                if doc.metadata.get("source") == "system": continue
-                context_parts.append(doc.page_content)
-            
-            return "\n---\n".join(context_parts)
+            context = "\n---\n".join(doc.page_content for doc in docs)
         except Exception as e:
             return f"Error retrieving security context: {str(e)}"
+        with self._lock:
+            self._search_cache[cache_key] = context
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return context
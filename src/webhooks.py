@@ -3,34 +3,103 @@ AI Sentinel - Webhook System
 Handles outbound events and automated mitigation actions.
 """
 
-import json
+import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any
 
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AI-Sentinel-Webhooks")
 
+# Endpoint that receives mitigation events; unset keeps the simulated (log-only) behaviour
+MITIGATION_WEBHOOK_URL = os.getenv("MITIGATION_WEBHOOK_URL", "")
+WEBHOOK_TIMEOUT = 2
+
+# (epoch second, ISO string) of the last formatted timestamp, replaced as one tuple so threads never mix them
+_ts_cache = (0, "")
+
+def _now_iso() -> str:
+    """Current UTC time as ISO-8601, formatted at most once per second"""
+    global _ts_cache
+    second = int(time.time())
+    cached_second, formatted = _ts_cache
+    if cached_second != second:
+        formatted = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(second))
+        _ts_cache = (second, formatted)
+    return formatted
+
+class _LazyJson:
+    """Log argument that serializes its payload only if the record is emitted"""
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return orjson.dumps(self.payload).decode()
+
+@lru_cache(maxsize=1)
+def _webhook_session() -> requests.Session:
+    """Pooled keep-alive session shared by every webhook POST"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+@lru_cache(maxsize=1)
+def _webhook_executor() -> ThreadPoolExecutor:
+    """Workers that deliver webhooks off the analysis path"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="sentinel-webhook")
+
+def _post_event(url: str, body: bytes) -> bool:
+    """POST one serialized event, logging failures (which would otherwise vanish in a worker)"""
+    try:
+        response = _webhook_session().post(url, data=body, headers={"Content-Type": "application/json"},
+                                           timeout=WEBHOOK_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning("Webhook delivery failed: %s", e)
+        return False
+    if response.status_code >= 400:
+        logger.warning("Webhook endpoint answered HTTP %s", response.status_code)
+        return False
+    return True
+
 class WebhookManager:
     """Manages automated mitigation actions via webhooks"""
     
     @staticmethod
-    def trigger_mitigation(action: str, target: str, details: str) -> Dict[str, Any]:
+    def trigger_mitigation(action: str, target: str, details: str, wait: bool = False) -> Dict[str, Any]:
         """
-        Simulate a webhook call to an external system (e.g., Firewall, EDR)
+        Send a webhook call to an external system (e.g., Firewall, EDR)
+        Delivered in the background unless wait is set, in which case a failed POST
+        returns status "failed"; simulated when MITIGATION_WEBHOOK_URL is unset.
         """
         event_payload = {
             "event_type": "MITIGATION_TRIGGERED",
             "action": action,
             "target": target,
             "details": details,
-            "timestamp": "2026-02-13T15:10:00Z"  # Mock timestamp
+            "timestamp": _now_iso()
         }
         
-        # In a real system, this would be a requests.post() call
-        logger.info(f"🚀 TRIGGERING WEBHOOK: {json.dumps(event_payload, indent=2)}")
+        logger.info("🚀 TRIGGERING WEBHOOK: %s", _LazyJson(event_payload))
+        delivered = True
+        if MITIGATION_WEBHOOK_URL:
+            body = orjson.dumps(event_payload)
+            if wait:
+                delivered = _post_event(MITIGATION_WEBHOOK_URL, body)
+            else:
+                _webhook_executor().submit(_post_event, MITIGATION_WEBHOOK_URL, body)
         
         return {
-            "status": "success",
+            "status": "success" if delivered else "failed",
             "source": "AI_Sentinel_SOAR",
             "action_taken": action,
             "system_notified": "EnterpriseFW-01"
@@ -1,7 +1,8 @@
 
+import asyncio
 import pytest
-from src.detector import GhostAIDetector
-from src.policies import APPROVED_DOMAINS, MALICIOUS_DOMAINS
+from src.detector import GhostAIDetector, categorize_urls
+from src.policies import APPROVED_DOMAINS, MALICIOUS_DOMAINS, build_domain_categories, classify_url
 
 def test_internal_domain_detection():
     detector = GhostAIDetector()
@@ -39,7 +40,7 @@ def test_batch_analyze_stats():
     detector = GhostAIDetector()
     logs = [
         {"request_url": "https://approved-partner.com", "payload_snippet": "ok"},
-        {"request_url": "https://unknown.ai", "payload_snippet": "IBAN NL12345"}
+        {"request_url": "https://unknown.ai", "payload_snippet": "IBAN NL91ABNA0417164300"}
     ]
     results = detector.batch_analyze(logs, use_agent=False)
     assert len(results) == 2
@@ -47,3 +48,39 @@ def test_batch_analyze_stats():
     assert "risk_distribution" in analytics
     # Allow for 0 threats since LLM might not be available in CI
     assert analytics["total_threats"] >= 0
+    assert analytics["sensitive_exfiltration_breakdown"].get("iban") == 1
+
+def test_batch_analyze_async_preserves_order():
+    detector = GhostAIDetector()
+    logs = [
+        {"request_url": "https://evil-phishing-site.com/login", "payload_snippet": "x"},
+        {"request_url": "https://approved-partner.com", "payload_snippet": "ok"},
+        {"request_url": "https://internal-ai.company.local/api", "payload_snippet": "hello"}
+    ]
+    results = asyncio.run(detector.batch_analyze_async(logs, use_agent=False, concurrency=2))
+    assert [r["risk_category"] for r in results] == ["CRITICAL", "APPROVED", "APPROVED"]
+    assert [r["log_entry"]["request_url"] for r in results] == [l["request_url"] for l in logs]
+
+def test_stream_analyze_yields_every_index_once():
+    detector = GhostAIDetector()
+    logs = [{"request_url": f"https://internal-ai.company.local/{i}", "payload_snippet": "hi"} for i in range(6)]
+    streamed = dict(detector.stream_analyze(logs, max_workers=3))
+    assert sorted(streamed) == list(range(6))
+    assert all(streamed[i]["log_entry"] is logs[i] for i in range(6))
+
+def test_categorize_urls_labels_each_url():
+    urls = ["https://claude.ai/chat", "https://evil-phishing-site.com", "https://example.org", "https://claude.ai/x"]
+    assert list(categorize_urls(urls)) == ["external_ai", "malicious", "", "external_ai"]
+
+def test_categorize_urls_agrees_with_classify_url_on_overlapping_lists():
+    categories = build_domain_categories(approved=["dual.example"], external_ai=["ai.example"],
+                                         malicious=["dual.example", "ai.example"])
+    urls = ["https://dual.example", "https://chat.ai.example/x", "https://example.org"]
+    expected = [classify_url(url, categories) for url in urls]
+    assert expected == ["approved", "external_ai", None]
+    assert list(categorize_urls(urls, categories)) == [label or "" for label in expected]
+
+def test_detectors_share_security_agent():
+    first = GhostAIDetector(provider="openai", api_key="mock_key")
+    second = GhostAIDetector(provider="openai", api_key="mock_key")
+    assert first.agent is second.agent
@@ -0,0 +1,19 @@
+import queue
+
+import src.notifications as notifications
+
+def test_full_alert_queue_drops_oldest(monkeypatch):
+    alerts = queue.Queue(maxsize=2)
+    monkeypatch.setattr(notifications, "_alert_queue", alerts)
+    for user in ("u1", "u2", "u3"):
+        notifications._enqueue_alert(("CRITICAL", user, "test"))
+    assert [alerts.get_nowait()[1] for _ in range(alerts.qsize())] == ["u2", "u3"]
+
+def test_flush_alerts_times_out_on_undelivered_alerts(monkeypatch):
+    alerts = queue.Queue()
+    monkeypatch.setattr(notifications, "_alert_queue", alerts)
+    alerts.put(("CRITICAL", "u1", "test"))
+    assert notifications.flush_alerts(timeout=0.05) is False
+    alerts.get_nowait()
+    alerts.task_done()
+    assert notifications.flush_alerts(timeout=0.05) is True
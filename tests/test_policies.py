@@ -1,6 +1,11 @@
 
 import os
-from src.policies import APPROVED_DOMAINS, EXTERNAL_AI_SERVICES, MALICIOUS_DOMAINS
+import time
+from src.policies import (
+    APPROVED_DOMAINS, EXTERNAL_AI_SERVICES, MALICIOUS_DOMAINS, SENSITIVE_COMBINED_RE, SENSITIVE_PATTERNS,
+    category_for_score, classify_url, domain_categories, domain_suffixes, get_detection_prompt,
+    matches_domain, scan_sensitive
+)
 
 def test_approved_domains_not_empty():
     assert len(APPROVED_DOMAINS) > 0
@@ -14,3 +19,43 @@ def test_external_services_structure():
 
 def test_malicious_domains_structure():
     assert "evil-phishing-site.com" in MALICIOUS_DOMAINS
+
+def test_detection_prompt_is_formatted_once():
+    first = get_detection_prompt(APPROVED_DOMAINS, EXTERNAL_AI_SERVICES)
+    assert first is get_detection_prompt(list(APPROVED_DOMAINS), list(EXTERNAL_AI_SERVICES))
+    assert "claude.ai" in first
+
+def test_matches_domain_on_label_boundaries():
+    domains = domain_suffixes(MALICIOUS_DOMAINS)
+    assert matches_domain("evil-phishing-site.com", domains)
+    assert matches_domain("login.evil-phishing-site.com", domains)
+    assert not matches_domain("notevil-phishing-site.com", domains)
+    assert not matches_domain("", domains)
+
+def test_domain_categories_single_walk():
+    assert domain_categories("login.evil-phishing-site.com") == {"malicious"}
+    assert domain_categories("claude.ai") == {"external_ai"}
+    assert domain_categories("example.org") == frozenset()
+    assert classify_url("https://Chat.OpenAI.com/c/1") == "external_ai"
+    assert classify_url("https://login.evil-phishing-site.com") == "malicious"
+    assert classify_url("https://openai.com.example.org") is None
+
+def test_sensitive_patterns_stay_fast_on_pathological_input():
+    for payload in ("a" * 10_000 + "!", "a." * 5_000 + "!"):
+        start = time.perf_counter()
+        assert not SENSITIVE_COMBINED_RE.search(payload)
+        assert not any(pattern.search(payload) for pattern in SENSITIVE_PATTERNS.values())
+        assert time.perf_counter() - start < 0.1
+
+def test_scan_sensitive_matches_individual_patterns():
+    payload = "IBAN NL20SECB0001234567, mail jan@bank.nl, call +31 20 555 1234, balance €125,430"
+    expected = tuple(name for name, pattern in SENSITIVE_PATTERNS.items() if pattern.search(payload))
+    assert scan_sensitive(payload) == expected
+    assert scan_sensitive("Normal query") == ()
+
+def test_category_for_score_follows_score_ranges():
+    assert category_for_score(0) == "APPROVED"
+    assert category_for_score(40) == "LOW_RISK"
+    assert category_for_score(41) == "MEDIUM_RISK"
+    assert category_for_score(95) == "CRITICAL"
+    assert category_for_score(150) == "CRITICAL"
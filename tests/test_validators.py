@@ -0,0 +1,13 @@
+
+from src.validators import iban_valid, luhn_valid
+
+def test_luhn_valid():
+    assert luhn_valid("79927398713")
+    assert not luhn_valid("79927398710")
+    assert not luhn_valid("7992-7398713")
+
+def test_iban_valid():
+    assert iban_valid("NL91ABNA0417164300")
+    assert iban_valid("GB82 WEST 1234 5698 7654 32")
+    assert not iban_valid("NL91BANK0417164300")
+    assert not iban_valid("NL12345")
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+import src.webhooks as webhooks
+from src.webhooks import WebhookManager
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class FakeSession:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.posts.append({"url": url, "data": data, "headers": headers, "timeout": timeout})
+        return FakeResponse(self.status_code)
+
+def test_trigger_mitigation_posts_event_and_reports_failure(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(webhooks, "MITIGATION_WEBHOOK_URL", "https://soar.example/hook")
+    monkeypatch.setattr(webhooks, "_webhook_session", lambda: session)
+
+    result = WebhookManager.trigger_mitigation("BLOCK_IP", "10.0.0.1", "test", wait=True)
+    assert result["status"] == "success"
+    post = session.posts[0]
+    assert post["url"] == "https://soar.example/hook"
+    assert post["timeout"] == webhooks.WEBHOOK_TIMEOUT
+    event = orjson.loads(post["data"])
+    assert (event["event_type"], event["action"], event["target"]) == ("MITIGATION_TRIGGERED", "BLOCK_IP", "10.0.0.1")
+
+    session.status_code = 503
+    assert WebhookManager.trigger_mitigation("BLOCK_IP", "10.0.0.1", "test", wait=True)["status"] == "failed"
+
+def test_trigger_mitigation_delivers_in_background(monkeypatch):
+    session = FakeSession()
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(webhooks, "MITIGATION_WEBHOOK_URL", "https://soar.example/hook")
+    monkeypatch.setattr(webhooks, "_webhook_session", lambda: session)
+    monkeypatch.setattr(webhooks, "_webhook_executor", lambda: executor)
+
+    assert WebhookManager.trigger_mitigation("CREATE_INCIDENT", "u1", "test")["status"] == "success"
+    executor.shutdown(wait=True)
+    assert orjson.loads(session.posts[0]["data"])["target"] == "u1"
+
+def test_trigger_mitigation_is_simulated_without_url(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(webhooks, "MITIGATION_WEBHOOK_URL", "")
+    monkeypatch.setattr(webhooks, "_webhook_session", lambda: session)
+
+    assert WebhookManager.trigger_mitigation("BLOCK_IP", "10.0.0.1", "test", wait=True)["status"] == "success"
+    assert session.posts == []